@@ -1,60 +1,134 @@
 import os
+import json
 import requests
 from hashlib import md5
-from typing import List
+from typing import List, Optional, Set, Tuple
 from logger import Logger
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 
+import metrics
+from http_cache import conditional_get, store_validators
+from utils import defer_update, submit_daemon, write_atomic
+
 load_dotenv()
 
 # Set up logging
 logging = Logger.setup_logger(__name__)
 
 SOURCE = 'aidy'
-AIDY_API_URL = os.environ.get('AIDY_API_URL') + "/api/topics/summarizer"
-AIDY_TOPICS = os.environ.get('AIDY_TOPICS').split(",")
+AIDY_SUMMARIZER_PATH = "/api/topics/summarizer"
+# Last summary and item id per topic
+AIDY_CACHE_PATH = 'aidy_cache.json'
 
-def pull_from_aidy(already_pushed: list[str]) -> List[str]:
-    res = []
 
+def get_aidy_config():
+    '''
+    Read the API URL and topics when the source runs rather than at import, so
+    importing this module never fails because the variables are unset.
+    '''
+    api_url = os.environ.get('AIDY_API_URL')
+    topics = os.environ.get('AIDY_TOPICS')
+    if not api_url or not topics:
+        return None, []
+    return api_url + AIDY_SUMMARIZER_PATH, topics.split(",")
+
+
+def load_topic_cache():
+    if not os.path.exists(AIDY_CACHE_PATH):
+        return {}
     try:
-        for topic in AIDY_TOPICS:
-            logging.info(f"Requesting bills for topic: {topic}")
-            # Make API request
-            response = requests.get(f"{AIDY_API_URL}/{topic}")
-            response.raise_for_status()  # Will raise HTTPError if the status code is 4xx, 5xx
-            response = response.json()
-            message = response["current_summary"]
-            link = response["topic_link"]
-
-            id = md5((SOURCE + message).encode()).hexdigest()
-
-            if id in already_pushed:
-                logging.info(f"Skipping already processed item with id: {id}")
-                continue
-
-            # Add new item
-            res.append({
-                "id": id,
-                "source": SOURCE,
-                "text": message,
-                "source_link": link,
-                "shown": False,
-                "type": "news",
-                "fetched_datetime": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-            })
-            already_pushed.append(id)
-
-            logging.info("Successfully retrieved response from AIDY API.")
-
-        return res
-
-    except requests.exceptions.RequestException as req_err:
-        logging.error(f"Request error: {req_err}")
+        with open(AIDY_CACHE_PATH, 'r') as f:
+            return json.load(f)
     except Exception as e:
+        logging.warning(f"Could not read {AIDY_CACHE_PATH}, starting empty: {e}")
+        return {}
+
+
+def save_topic_cache(changes):
+    """Write the changed topics into the cache, once the items they describe are saved."""
+    cache = load_topic_cache()
+    cache.update(changes)
+    write_atomic(AIDY_CACHE_PATH, json.dumps(cache, indent=4, ensure_ascii=False))
+
+
+def fetch_topic(api_url: str, topic: str) -> Optional[Tuple[str, str, requests.Response]]:
+    '''
+    Request the summary of one topic. Returns None when it was not modified.
+    '''
+    logging.info(f"Requesting bills for topic: {topic}")
+    response = conditional_get(f"{api_url}/{topic}")
+    if response is None:
+        return None
+    body = response.json()
+    return body["current_summary"], body["topic_link"], response
+
+
+def pull_from_aidy(already_pushed: Set[str]) -> List[str]:
+    res = []
+
+    api_url, topics = get_aidy_config()
+    if not api_url:
+        raise RuntimeError("AIDY_API_URL and AIDY_TOPICS must be set to pull from AIDY")
+
+    cache = load_topic_cache()
+    # Daemon threads like the pullers themselves, so a hung topic never holds up the exit
+    futures = [submit_daemon(fetch_topic, api_url, topic) for topic in topics]
+
+    changes = {}
+    failed_topics = 0
+    for topic, future in zip(topics, futures):
+        # Errors only drop their own topic
+        try:
+            result = future.result()
+        except requests.exceptions.RequestException as req_err:
+            logging.error(f"Request error for topic {topic}: {req_err}")
+            failed_topics += 1
+            continue
+        except Exception as e:
+            logging.error(f"An error occurred for topic {topic}: {str(e)}")
+            failed_topics += 1
+            continue
+        if result is None:
+            continue
+        message, link, response = result
+
+        # An unchanged summary was handled on an earlier run
+        cached = cache.get(topic)
+        if cached and cached["summary"] == message:
+            logging.info(f"Summary unchanged for topic: {topic}")
+            metrics.count("aidy_topics_unchanged_total")
+            store_validators(f"{api_url}/{topic}", response)
+            continue
+
+        id = md5((SOURCE + message).encode()).hexdigest()
+        changes[topic] = {"summary": message, "id": id}
+        store_validators(f"{api_url}/{topic}", response)
+
+        if id in already_pushed:
+            metrics.count("items_already_seen_total", source=SOURCE)
+            logging.info(f"Skipping already processed item with id: {id}")
+            continue
+
+        # Add new item
+        res.append({
+            "id": id,
+            "source": SOURCE,
+            "text": message,
+            "source_link": link,
+            "shown": False,
+            "type": "news",
+            "fetched_datetime": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+        })
+        already_pushed.add(id)
+
+    if changes:
+        # Written after the items are saved, so a discarded or crashed run
+        # never marks a summary as handled
+        defer_update(lambda: save_topic_cache(changes))
 
-        logging.error(f"An error occurred: {str(e)}")
-        # raise e
+    if failed_topics == len(topics):
+        raise RuntimeError(f"All {len(topics)} AIDY topics failed")
 
+    logging.info(f"Retrieved {len(res)} new summaries from {len(topics)} AIDY topics.")
     return res
@@ -0,0 +1,292 @@
+"""
+Per-stage latency and memory benchmark of one full run of the pipeline.
+
+Every source is served from recorded responses in benchmarks/fixtures by a
+local stand-in HTTP server. The feed and launch dates are shifted so the
+newest entries are current. The board API is stubbed by the same server.
+Each run works in a scratch directory on a synthetic data.json of the given
+size.
+
+    python benchmarks/pipeline.py [--sizes 500 5000 50000] [--repeat 3]
+                                  [--keep N] [--json results.json] [--baseline old.json]
+
+Stages are timed without tracing (median of --repeat runs). Peak memory per
+stage comes from one extra run under tracemalloc. With --baseline, stages
+that got more than REGRESSION_RATIO slower make the script exit with status 1.
+"""
+import os
+import re
+import copy
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, REPO_DIR)
+
+DEFAULT_SIZES = [500, 5000, 50000]
+DEFAULT_REPEAT = 3
+# A stage counts as a regression when it is this much slower than the baseline
+# and slower by more than REGRESSION_MIN_MS
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_MS = 5
+
+RSS_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S +0000"
+FEEDS = {"nyt": "nyt.xml", "spacenews": "spacenews.xml", "breaking_defense": "breaking_defense.xml"}
+SYNTHETIC_SOURCES = ["spacenews", "spacenews", "spacenews", "nyt", "breaking_defense", "aidy"]
+WORDS = (
+    "space force launch satellite orbit lunar rocket nasa contract mission radar constellation "
+    "starship booster payload station crew defense missile tracking spectrum budget funding "
+    "startup raises million billion commercial imaging navigation test flight debris accords"
+).split()
+
+
+def shift_rss_dates(xml: str, now: datetime) -> str:
+    """Shift every pubDate so the newest one is an hour ago."""
+    dates = [datetime.strptime(d, RSS_DATE_FORMAT).replace(tzinfo=timezone.utc) for d in re.findall(r"<pubDate>(.*?)</pubDate>", xml)]
+    offset = now - timedelta(hours=1) - max(dates)
+    return re.sub(
+        r"<pubDate>(.*?)</pubDate>",
+        lambda m: "<pubDate>" + (datetime.strptime(m.group(1), RSS_DATE_FORMAT) + offset).strftime(RSS_DATE_FORMAT) + "</pubDate>",
+        xml,
+    )
+
+
+def shift_launch_dates(sanity: dict, now: datetime) -> dict:
+    """Shift the launch dates so the first launch is three hours from now."""
+    dates = [datetime.fromisoformat(launch["launchDate"].replace("Z", "+00:00")) for launch in sanity["result"]]
+    offset = now + timedelta(hours=3) - min(dates)
+    for launch, date in zip(sanity["result"], dates):
+        launch["launchDate"] = (date + offset).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return sanity
+
+
+class FixtureServer:
+    """Local stand-in for the feeds, the Sanity API, the AIDY API and the board."""
+
+    def __init__(self):
+        now = datetime.now(timezone.utc)
+        routes = {}
+        for name, filename in FEEDS.items():
+            with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+                routes[f"/feeds/{name}.xml"] = ("application/rss+xml", shift_rss_dates(f.read(), now).encode())
+        with open(os.path.join(FIXTURES_DIR, "sanity.json")) as f:
+            routes["/sanity"] = ("application/json", json.dumps(shift_launch_dates(json.load(f), now)).encode())
+        with open(os.path.join(FIXTURES_DIR, "aidy.json")) as f:
+            self.topics = json.load(f)
+        for topic, body in self.topics.items():
+            routes[f"/api/topics/summarizer/{topic}"] = ("application/json", json.dumps(body).encode())
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                content_type, body = routes.get(self.path.split("?")[0], (None, None))
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def make_db(size: int, seed: int = 0) -> dict:
+    """A version 2 db of `size` items spread over the last 30 days."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    data = []
+    for n in range(size):
+        fetched = now - timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        shown = sorted(fetched + timedelta(seconds=rng.randrange(3 * 24 * 3600)) for _ in range(rng.choice([0, 0, 1, 2, 3])))
+        data.append({
+            "id": f"{n:032x}",
+            "source": rng.choice(SYNTHETIC_SOURCES),
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(6, 14))).capitalize(),
+            "source_link": f"https://example.com/{n}",
+            "shown": bool(shown),
+            "type": "news",
+            "fetched_datetime": fetched.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "shown_at": [t.strftime("%Y-%m-%dT%H:%M:%S.%fZ") for t in shown if t < now],
+        })
+    return {"version": "2", "last_run_datetime": "", "trigger_count": 0, "current_item_id": "", "data": data}
+
+
+class Recorder:
+    def __init__(self, trace: bool):
+        self.trace = trace
+        self.results = {}
+
+    def measure(self, stage, fn, *args):
+        if self.trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.trace:
+            self.results[stage] = (tracemalloc.get_traced_memory()[1] - before) // 1024
+        else:
+            self.results[stage] = elapsed
+        return result
+
+
+def reset_modules(server_url: str):
+    """Point every module at the stand-in server and drop state cached by earlier runs."""
+    import nyt, spacenews, breaking_defense
+    import http_cache, supercluster, health, frame_cache, vestaboard
+
+    for source in (nyt.nyt, spacenews.spacenews, breaking_defense.breaking_defense):
+        source.url = f"{server_url}/feeds/{source.name}.xml"
+    supercluster.SANITY_API_URL = f"{server_url}/sanity"
+    vestaboard.VESTABOARD_RW_URL = f"{server_url}/rw"
+    # The compose API is not stubbed; the benchmark measures the local renderer
+    vestaboard.VBML_RENDERER = "local"
+    vestaboard._client = vestaboard.VestaboardClient("benchmark", min_push_interval=0)
+    http_cache._cache = None
+    supercluster._catalogue = None
+    health._source_health = None
+    frame_cache._frame_cache = None
+
+
+def run_pipeline(size: int, server: FixtureServer, db_json: str, trace: bool) -> dict:
+    import main
+    import utils
+
+    workdir = tempfile.mkdtemp(prefix="vestaboard-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open(utils.DB_PATH, "w") as f:
+            f.write(db_json)
+        reset_modules(server.url)
+        os.environ["AIDY_API_URL"] = server.url
+        os.environ["AIDY_TOPICS"] = ",".join(server.topics)
+
+        recorder = Recorder(trace)
+        db = recorder.measure("get_db", utils.get_db)
+
+        # cleanup_db on its own, on a copy that was not cleaned up today. The
+        # items are copied too, as cleanup_db trims their show history.
+        snapshot = {"last_run_datetime": "", "data": copy.deepcopy(db["data"])}
+        recorder.measure("cleanup_db", utils.cleanup_db, snapshot)
+
+        for source_name in main.SOURCES:
+            puller = main.get_puller(source_name)
+            new_items = recorder.measure(f"fetch:{source_name}", puller, set(db.ids_for_source(source_name)))
+            recorder.measure(f"add_items:{source_name}", db.add_items, new_items)
+
+        # Force a rotation: scheduling, rendering and the push to the stand-in board
+        db["trigger_count"] = main.MESSAGE_CHANGE_FREQUENCY - 1
+        recorder.measure("execute", main.execute, db, False)
+        recorder.measure("generate_report", utils.generate_report, db)
+        recorder.measure("save_db", utils.save_db, db)
+        return recorder.results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir)
+
+
+def benchmark(sizes, repeat, keep):
+    import utils
+
+    server = FixtureServer()
+    results = {}
+    try:
+        for size in sizes:
+            utils.NUM_OF_OLD_NEWS_TO_KEEP = keep or size
+            db_json = json.dumps(make_db(size))
+            runs = [run_pipeline(size, server, db_json, trace=False) for _ in range(repeat)]
+            tracemalloc.start()
+            memory = run_pipeline(size, server, db_json, trace=True)
+            tracemalloc.stop()
+            results[str(size)] = {
+                stage: {"ms": round(statistics.median(run[stage] for run in runs), 2), "peak_kb": memory[stage]}
+                for stage in runs[0]
+            }
+    finally:
+        server.close()
+    return results
+
+
+def print_table(results):
+    sizes = list(results)
+    stages = list(results[sizes[0]])
+    width = max(len(stage) for stage in stages)
+    print(f"{'stage':<{width}}" + "".join(f" {size + ' items':>24}" for size in sizes))
+    for stage in stages:
+        cells = "".join(
+            f" {results[size][stage]['ms']:>10.1f} ms {results[size][stage]['peak_kb']:>8} KB" for size in sizes)
+        print(f"{stage:<{width}}{cells}")
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for size, stages in results.items():
+        for stage, measured in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if not before:
+                continue
+            if measured["ms"] > before["ms"] * REGRESSION_RATIO and measured["ms"] - before["ms"] > REGRESSION_MIN_MS:
+                regressions.append(f"{stage} at {size} items: {before['ms']} ms -> {measured['ms']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--keep", type=int, help="NUM_OF_OLD_NEWS_TO_KEEP for the runs (default: the db size)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results written earlier with --json")
+    args = parser.parse_args()
+
+    # The stages log every step; only the table is of interest here
+    logging.disable(logging.WARNING)
+    results = benchmark(args.sizes, args.repeat, args.keep)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": platform.python_version(), "created": datetime.now(timezone.utc).isoformat(),
+                       "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f)["results"])
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
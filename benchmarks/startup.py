@@ -0,0 +1,93 @@
+"""
+Startup-time benchmark for the common trigger that keeps the current item.
+
+Runs `python main.py` in a scratch directory against a db whose trigger count
+is below MESSAGE_CHANGE_FREQUENCY, so execute returns without fetching or
+pushing. The "eager" case imports every puller and the board client first,
+the way main.py used to at module load, and then runs the same trigger.
+
+    python benchmarks/startup.py [runs]
+"""
+import os
+import sys
+import json
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RUNS = 10
+
+EAGER_IMPORTS = "import supercluster, spacenews, nyt, aidy, breaking_defense, vestaboard"
+CASES = {
+    "lazy": [sys.executable, os.path.join(REPO_DIR, "main.py")],
+    "eager": [sys.executable, "-c", f"{EAGER_IMPORTS}; import runpy; runpy.run_path({os.path.join(REPO_DIR, 'main.py')!r}, run_name='__main__')"],
+}
+
+
+def write_db(path):
+    """A small db whose current item is a news item halfway through its cycle."""
+    # Stamped now so the cleanup on load keeps the item
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    db = {
+        "version": "2",
+        "last_run_datetime": "",
+        "trigger_count": 1,
+        "current_item_id": "benchmark",
+        "data": [{
+            "id": "benchmark",
+            "source": "nyt",
+            "text": "Benchmark item",
+            "source_link": "",
+            "shown": True,
+            "type": "news",
+            "fetched_datetime": now,
+            "shown_at": [now],
+            "show_count": 1,
+        }],
+    }
+    with open(path, "w") as f:
+        json.dump(db, f)
+
+
+def time_run(command, workdir):
+    # Every run starts from the same db so each one takes the fast path
+    write_db(os.path.join(workdir, "data.json"))
+    state_path = os.path.join(workdir, "data.state.json")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    # The old eager import of aidy crashed without these
+    env.setdefault("AIDY_API_URL", "http://localhost")
+    env.setdefault("AIDY_TOPICS", "benchmark")
+
+    start = time.perf_counter()
+    subprocess.run(command, cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    workdir = tempfile.mkdtemp(prefix="vestaboard-startup-")
+    try:
+        results = {}
+        for name, command in CASES.items():
+            # One untimed run to warm the bytecode and filesystem caches
+            time_run(command, workdir)
+            results[name] = [time_run(command, workdir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{'case':<8} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for name, timings in results.items():
+        print(f"{name:<8} {statistics.median(timings) * 1000:>10.1f} {min(timings) * 1000:>10.1f} {max(timings) * 1000:>10.1f}")
+    speedup = statistics.median(results["eager"]) / statistics.median(results["lazy"])
+    print(f"\nThe lazy fast path starts {speedup:.1f}x faster than eager imports ({runs} runs each).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import requests
+import metrics
+from logger import Logger
+
+from frame import Frame
+from frame_cache import get_frame_cache
+from utils import get_time_remaining_until
+from vbml import render_component
+from vestaboard import SOURCE_COLORS, countdown_component, get_client, render_item
+
+logging = Logger.setup_logger(__name__)
+
+# Countdowns show minutes, so they are checked once a minute
+COUNTDOWN_CADENCE = 60
+
+
+def render_countdown(frame, time_remaining):
+    """Re-render only the countdown cells of a launch frame."""
+    component = countdown_component(time_remaining)
+    position = component["style"]["absolutePosition"]
+    frame.paste(render_component(component), position["x"], position["y"])
+
+
+class Countdown:
+    """
+    Keeps the countdown of the launch on the board up to date between
+    rotations. The launch frame stays in memory, each refresh re-renders only
+    the countdown cells, and the board is only pushed when the displayed
+    minute changed. Nothing is read from or written to the db.
+    """
+
+    def __init__(self):
+        self.item_id = None
+        self.frame = None
+
+    def refresh(self, item):
+        """Push the countdown of the item if it is a launch and its minute changed. Returns True on a push."""
+        if item is None or item.type != 'launch':
+            self.item_id, self.frame = None, None
+            return False
+        time_remaining = get_time_remaining_until(item.target_at)
+        if not time_remaining:
+            return False
+
+        if item.id != self.item_id:
+            item.time_remaining = time_remaining
+            self.frame = Frame(render_item(item, SOURCE_COLORS[item.source]))
+            self.item_id = item.id
+        else:
+            render_countdown(self.frame, time_remaining)
+
+        frame_cache = get_frame_cache()
+        characters = self.frame.to_list()
+        if characters == frame_cache.current_frame:
+            return False
+        try:
+            with metrics.span("push", kind="countdown"):
+                get_client().send(characters)
+        except requests.exceptions.RequestException as req_err:
+            metrics.count("push_failures_total")
+            logging.error(f"Request error while updating the countdown: {req_err}")
+            return False
+        metrics.count("pushes_total")
+        frame_cache.current_frame = characters
+        frame_cache.save()
+        logging.info(f"Countdown updated to {time_remaining}")
+        return True
@@ -0,0 +1,126 @@
+import os
+import time
+import heapq
+import signal
+import metrics
+from logger import Logger
+
+from countdown import COUNTDOWN_CADENCE, Countdown
+from main import SOURCES, execute, fetch_all_sources
+from utils import get_db, save_db, generate_report
+
+logging = Logger.setup_logger(__name__)
+
+# Intervals in seconds
+ROTATION_INTERVAL = int(os.getenv('DAEMON_ROTATION_INTERVAL', 600))
+CHECKPOINT_INTERVAL = int(os.getenv('DAEMON_CHECKPOINT_INTERVAL', 300))
+# Expired launches are dropped on every retention pass, old items and show
+# history once a day, as on every one-shot run
+RETENTION_INTERVAL = int(os.getenv('DAEMON_RETENTION_INTERVAL', 3600))
+DEFAULT_FETCH_INTERVAL = 900
+SOURCE_FETCH_INTERVALS = {
+    "supercluster": 1800,
+    "spacenews": 600,
+    "nyt": 900,
+    "aidy": 3600,
+    "breaking_defense": 900,
+}
+
+
+class Daemon:
+    """
+    Resident replacement for the one-shot `python main.py` runs. The item store,
+    caches stay loaded; the rotation, every source fetch, the checkpoint and
+    the retention pass each run on their own interval. In between, the
+    countdown of a launch on the board is refreshed every minute.
+    """
+
+    def __init__(self):
+        self.db = get_db()
+        self.running = True
+        self.countdown = Countdown()
+        # (due time, task name) pairs, on the monotonic clock
+        self.schedule = []
+        now = time.monotonic()
+        for source_name in SOURCES:
+            heapq.heappush(self.schedule, (now, f"fetch:{source_name}"))
+        heapq.heappush(self.schedule, (now, "rotate"))
+        heapq.heappush(self.schedule, (now + self.interval("countdown"), "countdown"))
+        heapq.heappush(self.schedule, (now + CHECKPOINT_INTERVAL, "checkpoint"))
+        heapq.heappush(self.schedule, (now + RETENTION_INTERVAL, "retention"))
+
+    def interval(self, task):
+        if task == "rotate":
+            return ROTATION_INTERVAL
+        if task == "checkpoint":
+            return CHECKPOINT_INTERVAL
+        if task == "retention":
+            return RETENTION_INTERVAL
+        if task == "countdown":
+            # Right after the next minute boundary, when the countdown text changes
+            return COUNTDOWN_CADENCE - time.time() % COUNTDOWN_CADENCE + 1
+        return SOURCE_FETCH_INTERVALS.get(task.split(":", 1)[1], DEFAULT_FETCH_INTERVAL)
+
+    def run_tasks(self, tasks):
+        # Sources that are due together are fetched concurrently, before the rotation
+        due_sources = [task.split(":", 1)[1] for task in tasks if task.startswith("fetch:")]
+        if due_sources:
+            fetch_all_sources(self.db, due_sources)
+        if "rotate" in tasks:
+            with metrics.span("execute"):
+                execute(self.db, fetch=False)
+        if "countdown" in tasks:
+            self.countdown.refresh(self.db.get_item(self.db.get("current_item_id")))
+        if "checkpoint" in tasks:
+            self.checkpoint()
+        if "retention" in tasks:
+            self.retention()
+
+    def checkpoint(self):
+        if self.db.is_dirty:
+            with metrics.span("report"):
+                generate_report(self.db)
+        # Also when nothing changed, so updates waiting for the save are applied
+        with metrics.span("save"):
+            save_db(self.db)
+        # Metrics are flushed every checkpoint, one record per interval
+        metrics.flush()
+
+    def retention(self):
+        """Save, then reload the db through get_db, which applies the retention rules."""
+        self.checkpoint()
+        with metrics.span("load"):
+            self.db = get_db()
+
+    def stop(self, signum, frame):
+        logging.info(f"Received signal {signum}, stopping after the current task.")
+        self.running = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logging.info("Daemon started.")
+
+        while self.running:
+            wait = self.schedule[0][0] - time.monotonic()
+            if wait > 0:
+                # Sleep in short steps so signals are handled promptly
+                time.sleep(min(wait, 1))
+                continue
+
+            tasks = []
+            while self.schedule and self.schedule[0][0] <= time.monotonic():
+                tasks.append(heapq.heappop(self.schedule)[1])
+            try:
+                self.run_tasks(tasks)
+            except Exception as e:
+                logging.error(f"Tasks {tasks} failed: {e}")
+            for task in tasks:
+                heapq.heappush(self.schedule, (time.monotonic() + self.interval(task), task))
+
+        self.checkpoint()
+        logging.info("Daemon stopped.")
+
+
+if __name__ == '__main__':
+    Daemon().run()
@@ -0,0 +1,107 @@
+import re
+import hashlib
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+
+# Titles are compared as sets of the words of their normalized text. MinHash
+# signatures, split into bands of BAND_ROWS values, only find the candidates;
+# their similarity is then computed exactly. With 64 bands of 2, titles at the
+# threshold become candidates with a probability of 98%.
+NUM_HASHES = 128
+BAND_ROWS = 2
+
+# Jaccard similarity of the word sets above which a title counts as a repeat.
+# Other outlets reword a story, e.g. "LeoLabs deploys mobile space-tracking
+# radar..." and "LeoLab's new, mobile space-watch radar..." share 4 of 13
+# words (0.31). One outlet mostly repeats its own headlines with small edits,
+# and reuses a template for different stories ("Serbia signs the Artemis
+# Accords", 0.6).
+SIMILARITY_THRESHOLD = 0.25
+SAME_SOURCE_SIMILARITY_THRESHOLD = 0.8
+# Only items fetched this recently are considered
+DEDUP_WINDOW_US = 3 * 24 * 60 * 60 * 1_000_000
+
+STOP_WORDS = {"a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "with", "at", "by", "from", "as", "is", "are", "its", "new"}
+
+_rng = np.random.default_rng(2024)
+# Multiply-shift hash functions; odd multipliers keep them bijective mod 2**64
+HASH_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_HASHES, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+HASH_OFFSETS = _rng.integers(0, 2 ** 63, NUM_HASHES, dtype=np.uint64)
+
+
+def normalize(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"'s\b", "", text)
+    words = [word for word in re.findall(r"[a-z0-9]+", text) if word not in STOP_WORDS]
+    # Crude plural stripping so "LeoLabs" and "LeoLab's" meet
+    return " ".join(word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words)
+
+
+def words(text: str) -> frozenset:
+    return frozenset(normalize(text).split())
+
+
+def signature(title_words: frozenset) -> np.ndarray:
+    """MinHash signature of a set of words."""
+    if not title_words:
+        return np.zeros(NUM_HASHES, dtype=np.uint64)
+    # A stable hash, unlike hash(), so signatures do not depend on the process
+    hashes = np.array([
+        int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little") for word in title_words
+    ], dtype=np.uint64)
+    hashed = HASH_MULTIPLIERS[:, None] * hashes[None, :] + HASH_OFFSETS[:, None]
+    return (hashed >> np.uint64(32)).min(axis=1)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def numbers(text: str) -> frozenset:
+    return frozenset(re.findall(r"\d+", text))
+
+
+class SimilarityIndex:
+    """
+    Locality-sensitive hashing index over item titles. Adding an item and
+    looking up its near-duplicates both take a fixed number of bucket lookups.
+    """
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+        # id -> (source, fetched_at, words, numbers)
+        self.entries = {}
+
+    def band_keys(self, sig: np.ndarray):
+        for band in range(NUM_HASHES // BAND_ROWS):
+            yield (band, *sig[band * BAND_ROWS:(band + 1) * BAND_ROWS].tolist())
+
+    def add(self, item, title_words: Optional[frozenset] = None, sig: Optional[np.ndarray] = None):
+        title_words = words(item.text) if title_words is None else title_words
+        sig = signature(title_words) if sig is None else sig
+        self.entries[item.id] = (item.source, item.fetched_at, title_words, numbers(item.text))
+        for key in self.band_keys(sig):
+            self.buckets[key].append(item.id)
+
+    def find_duplicate(self, item) -> Optional[str]:
+        """Return the id of an indexed near-duplicate of the item and index the item."""
+        title_words = words(item.text)
+        sig = signature(title_words)
+        item_numbers = numbers(item.text)
+        candidates = dict.fromkeys(candidate for key in self.band_keys(sig) for candidate in self.buckets.get(key, ()))
+        duplicate = None
+        for candidate in candidates:
+            source, fetched_at, candidate_words, candidate_numbers = self.entries[candidate]
+            if abs(item.fetched_at - fetched_at) > DEDUP_WINDOW_US:
+                continue
+            # "Day 2" and "Day 3", or "9th" and "8th", are different stories
+            if item_numbers and candidate_numbers and item_numbers != candidate_numbers:
+                continue
+            threshold = SAME_SOURCE_SIMILARITY_THRESHOLD if source == item.source else SIMILARITY_THRESHOLD
+            if jaccard(title_words, candidate_words) >= threshold:
+                duplicate = candidate
+                break
+        self.add(item, title_words, sig)
+        return duplicate
@@ -0,0 +1,177 @@
+import time
+import requests
+from hashlib import md5
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set
+import xml.etree.ElementTree as ET  # NOQA
+
+import metrics
+from logger import Logger
+from http_cache import conditional_get, store_validators
+
+logging = Logger.setup_logger(__name__)
+
+# Example pubDate format: "Fri, 22 Sep 2023 09:13:12 +0000"
+RSS_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
+
+# Feeds are newest first, but a few items can be out of order. Reading stops
+# after this many items in a row that are older than the cutoff.
+MAX_STALE_ITEMS = 3
+
+
+class FeedItem:
+    """The fields of an RSS <item> the pullers use."""
+    __slots__ = ("title", "link", "published", "categories")
+
+    def __init__(self, title: Optional[str], link: Optional[str], published: Optional[datetime], categories: List[str]):
+        self.title = title
+        self.link = link
+        self.published = published
+        self.categories = categories
+
+
+def parse_item(elem) -> FeedItem:
+    published = None
+    pubdate = elem.findtext('pubDate')
+    if pubdate:
+        try:
+            published = datetime.strptime(pubdate.strip(), RSS_DATE_FORMAT)
+        except ValueError:
+            logging.warning(f"Could not parse pubDate: {pubdate}")
+    categories = [cat.text.strip().lower() for cat in elem.findall('category') if cat.text]
+    return FeedItem(elem.findtext('title'), elem.findtext('link'), published, categories)
+
+
+def iter_feed_items(response, cutoff: Optional[datetime] = None) -> Iterator[FeedItem]:
+    """
+    Stream the <item> elements of an RSS response fetched with stream=True.
+    Each item is dropped from the tree once read, and reading stops once the
+    items are older than `cutoff`, so the rest of the body is never downloaded.
+    """
+    # Let urllib3 undo any gzip/deflate transfer encoding while streaming
+    response.raw.decode_content = True
+    channel = None
+    stale_items = 0
+    try:
+        for event, elem in ET.iterparse(response.raw, events=("start", "end")):
+            if event == "start":
+                if elem.tag == "channel":
+                    channel = elem
+                continue
+            if elem.tag != "item":
+                continue
+
+            item = parse_item(elem)
+            elem.clear()
+            if channel is not None:
+                channel.remove(elem)
+
+            if cutoff is not None and item.published is not None and item.published < cutoff:
+                stale_items += 1
+                if stale_items >= MAX_STALE_ITEMS:
+                    logging.info("Reached items older than the cutoff, stopping the feed early.")
+                    break
+                continue
+            stale_items = 0
+            yield item
+    finally:
+        response.close()
+
+
+class FeedSource:
+    """
+    An RSS source described by configuration. Fetching, streaming, filtering
+    and dedup are shared, so a new feed only needs a name, a URL and its filters:
+
+        FeedSource('nyt', "https://.../Space.xml", max_age_days=2)
+
+    max_age_days: items published before midnight UTC that many days ago are
+        skipped; 0 keeps only today's items.
+    required_categories: an item needs at least one of these categories.
+    excluded_categories: items with any of these categories are skipped.
+    """
+
+    def __init__(self, name: str, url: str, max_age_days: int = 0, headers: Optional[Dict[str, str]] = None,
+                 required_categories: Optional[Set[str]] = None, excluded_categories: Optional[Set[str]] = None):
+        self.name = name
+        self.url = url
+        self.max_age_days = max_age_days
+        self.headers = headers
+        self.required_categories = required_categories or set()
+        self.excluded_categories = excluded_categories or set()
+        self.logging = Logger.setup_logger(name)
+        # Counters of the last pull
+        self.stats = {}
+
+    def cutoff(self) -> datetime:
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return today - timedelta(days=self.max_age_days)
+
+    def accepts(self, item: FeedItem, cutoff: datetime) -> bool:
+        if not item.title or item.published is None or item.published < cutoff:
+            return False
+        if self.required_categories and not self.required_categories.intersection(item.categories):
+            return False
+        return not self.excluded_categories.intersection(item.categories)
+
+    def item_id(self, message: str) -> str:
+        return md5((self.name + message).encode()).hexdigest()
+
+    def pull(self, already_pushed: Set[str]) -> List[dict]:
+        res = []
+        stats = {"read": 0, "filtered": 0, "duplicates": 0, "new": 0, "not_modified": False}
+        self.stats = stats
+        start = time.monotonic()
+        try:
+            self.logging.info(f"Fetching feed from {self.url}")
+            response = conditional_get(self.url, headers=self.headers, stream=True)
+            if response is None:
+                stats["not_modified"] = True
+                return res
+
+            cutoff = self.cutoff()
+            for item in iter_feed_items(response, cutoff):
+                stats["read"] += 1
+                if not self.accepts(item, cutoff):
+                    stats["filtered"] += 1
+                    continue
+
+                message = item.title
+                id = self.item_id(message)
+                if id in already_pushed:
+                    stats["duplicates"] += 1
+                    continue
+
+                res.append({
+                    "id": id,
+                    "source": self.name,
+                    "text": message,
+                    "source_link": item.link,
+                    "shown": False,
+                    "type": "news",
+                    "fetched_datetime": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+                })
+                already_pushed.add(id)
+
+            store_validators(self.url, response)
+
+        except requests.exceptions.RequestException as req_err:
+            # Raised so the fetch stage can count the failure against the source
+            stats["error"] = f"Request error: {req_err}"
+            raise
+        except Exception as e:
+            stats["error"] = f"An error occurred: {e}"
+            raise
+        finally:
+            stats["new"] = len(res)
+            stats["duration_ms"] = round((time.monotonic() - start) * 1000)
+            metrics.count("feed_items_read_total", stats["read"], source=self.name)
+            metrics.count("feed_items_filtered_total", stats["filtered"], source=self.name)
+            metrics.count("items_already_seen_total", stats["duplicates"], source=self.name)
+            self.logging.info(
+                f"Read {stats['read']} items in {stats['duration_ms']} ms: {stats['new']} new, "
+                f"{stats['filtered']} filtered, {stats['duplicates']} already seen"
+                + (" (not modified)" if stats["not_modified"] else "")
+                + (f" ({stats['error']})" if "error" in stats else ""))
+
+        return res
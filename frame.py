@@ -0,0 +1,89 @@
+import numpy as np
+
+BOARD_ROWS = 6
+BOARD_COLS = 22
+
+# Character mapping for Vestaboard
+char_to_code = {
+    ' ': 0, 'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8, 'I': 9, 'J': 10, 'K': 11, 'L': 12, 'M': 13,
+    'N': 14, 'O': 15, 'P': 16, 'Q': 17, 'R': 18, 'S': 19, 'T': 20, 'U': 21, 'V': 22, 'W': 23, 'X': 24, 'Y': 25, 'Z': 26,
+    '1': 27, '2': 28, '3': 29, '4': 30, '5': 31, '6': 32, '7': 33, '8': 34, '9': 35, '0': 36, '!': 37, '@': 38, '#': 39,
+    '$': 40, '(': 41, ')': 42, '-': 44, '+': 46, '&': 47, '=': 48, ';': 49, ':': 50, "'": 52, '"': 53, '%': 54, ',': 55,
+    '.': 56, '/': 59, '?': 60, '°': 62, 'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8, 'i': 9, 'j': 10,
+    'k': 11, 'l': 12, 'm': 13, 'n': 14, 'o': 15, 'p': 16, 'q': 17, 'r': 18, 's': 19, 't': 20, 'u': 21, 'v': 22, 'w': 23,
+    'x': 24, 'y': 25, 'z': 26
+}
+
+# Typographic characters that feeds use, mapped to what the board can show
+char_replacements = {'’': "'", '‘': "'", '“': '"', '”': '"', '–': '-', '—': '-'}
+
+# Number of positions on a flap drum. Flaps only turn forward, so moving from
+# code a to code b takes (b - a) % FLAP_COUNT steps. This assumes the drum order
+# follows the character codes, which makes flap counts an estimate.
+FLAP_COUNT = 72
+
+# Lookup table from Latin-1 code points to character codes; anything else is blank
+TRANSLATION_TABLE = np.zeros(256, dtype=np.uint8)
+for char, code in char_to_code.items():
+    if ord(char) < 256:
+        TRANSLATION_TABLE[ord(char)] = code
+
+REPLACEMENTS = str.maketrans(char_replacements)
+
+
+def encode(text: str) -> np.ndarray:
+    """Translate a string into a uint8 array of character codes in one pass."""
+    points = np.frombuffer(text.translate(REPLACEMENTS).encode('utf-32-le'), dtype='<u4')
+    return np.where(points < 256, TRANSLATION_TABLE[np.minimum(points, 255)], 0).astype(np.uint8)
+
+
+def place_row(row: np.ndarray, codes, justify: str = "left"):
+    """Write codes into a row, justified left, center or right and cut at the row width."""
+    codes = codes[:len(row)]
+    if justify == "center":
+        start = (len(row) - len(codes)) // 2
+    elif justify == "right":
+        start = len(row) - len(codes)
+    else:
+        start = 0
+    row[:] = 0
+    row[start:start + len(codes)] = codes
+
+
+class Frame:
+    """A 6x22 board frame backed by a uint8 array of character codes."""
+    __slots__ = ("codes",)
+
+    def __init__(self, codes=None):
+        if codes is None:
+            self.codes = np.zeros((BOARD_ROWS, BOARD_COLS), dtype=np.uint8)
+        else:
+            self.codes = np.asarray(codes, dtype=np.uint8).reshape(BOARD_ROWS, BOARD_COLS)
+
+    def __eq__(self, other):
+        return isinstance(other, Frame) and np.array_equal(self.codes, other.codes)
+
+    def to_list(self):
+        """The nested list layout the read/write API expects."""
+        return self.codes.tolist()
+
+    def set_row_centered(self, row: int, text: str):
+        """Write text centered on a row, cutting it at the board width."""
+        place_row(self.codes[row], encode(text), "center")
+
+    def paste(self, grid: np.ndarray, x: int, y: int):
+        """Draw a grid of codes with its top left corner at (x, y), clipped to the board."""
+        height, width = grid.shape
+        top, left = max(y, 0), max(x, 0)
+        bottom, right = min(y + height, BOARD_ROWS), min(x + width, BOARD_COLS)
+        if top < bottom and left < right:
+            self.codes[top:bottom, left:right] = grid[top - y:bottom - y, left - x:right - x]
+
+    def diff(self, other: "Frame") -> np.ndarray:
+        """Return the (row, col) pairs of the cells that differ from the other frame."""
+        return np.argwhere(self.codes != other.codes)
+
+    def flaps_from(self, previous: "Frame") -> int:
+        """Estimate how many flap steps the board turns to go from the previous frame to this one."""
+        steps = (self.codes.astype(np.int16) - previous.codes.astype(np.int16)) % FLAP_COUNT
+        return int(steps.sum())
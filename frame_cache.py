@@ -0,0 +1,65 @@
+import os
+import json
+from collections import OrderedDict
+from logger import Logger
+from utils import write_atomic
+
+logging = Logger.setup_logger(__name__)
+
+FRAME_CACHE_PATH = 'frame_cache.json'
+MAX_CACHED_FRAMES = 64
+
+
+class FrameCache:
+    """
+    Bounded LRU of rendered board frames, keyed by item id, color and countdown
+    text, that also remembers the frame currently on the board.
+    """
+
+    def __init__(self, path=FRAME_CACHE_PATH, max_frames=MAX_CACHED_FRAMES):
+        self.path = path
+        self.max_frames = max_frames
+        self.frames = OrderedDict()
+        self.current_frame = None
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    cached = json.load(f)
+                self.frames.update(cached.get("frames", {}))
+                self.current_frame = cached.get("current_frame")
+            except Exception as e:
+                logging.warning(f"Could not read frame cache, starting empty: {e}")
+
+    @staticmethod
+    def key(item_id, color, time_remaining=''):
+        return f"{item_id}:{color}:{time_remaining or ''}"
+
+    def get(self, key):
+        frame = self.frames.get(key)
+        if frame is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.frames.move_to_end(key)
+        return frame
+
+    def put(self, key, frame):
+        self.frames[key] = frame
+        self.frames.move_to_end(key)
+        while len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+
+    def save(self):
+        write_atomic(self.path, json.dumps({"current_frame": self.current_frame, "frames": self.frames}))
+
+
+_frame_cache = None
+
+
+def get_frame_cache():
+    global _frame_cache
+    if _frame_cache is None:
+        _frame_cache = FrameCache()
+    return _frame_cache
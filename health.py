@@ -0,0 +1,104 @@
+import os
+import json
+from datetime import datetime, timezone, timedelta
+from logger import Logger
+from utils import write_atomic
+
+logging = Logger.setup_logger(__name__)
+
+# Kept next to data.json
+HEALTH_PATH = 'source_health.json'
+
+# Circuit breaker: after this many failures in a row a source is skipped for a
+# cooldown that doubles with every further failure
+FAILURE_THRESHOLD = 3
+BASE_COOLDOWN = timedelta(minutes=30)
+MAX_COOLDOWN = timedelta(hours=12)
+
+# Adaptive polling: a source averaging fewer new items per fetch than this is
+# quiet, and each empty fetch in a row doubles the wait before the next one
+QUIET_AVERAGE_NEW_ITEMS = 0.5
+BASE_QUIET_INTERVAL = timedelta(minutes=30)
+MAX_QUIET_INTERVAL = timedelta(hours=6)
+
+# Weight of the latest fetch in the moving average of new items
+AVERAGE_WEIGHT = 0.3
+
+
+def backoff(base, streak, limit):
+    return min(base * (2 ** max(streak - 1, 0)), limit)
+
+
+class SourceHealth:
+    """Per-source fetch history used to decide which sources are worth fetching."""
+
+    def __init__(self, path=HEALTH_PATH):
+        self.path = path
+        self.sources = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.sources = json.load(f)
+            except Exception as e:
+                logging.warning(f"Could not read {path}, starting empty: {e}")
+
+    def state(self, source_name):
+        return self.sources.setdefault(source_name, {
+            "consecutive_failures": 0,
+            "empty_fetches": 0,
+            "avg_new_items": None,
+            "last_success": None,
+            "last_failure": None,
+            "next_fetch": None,
+        })
+
+    def should_fetch(self, source_name, now=None):
+        next_fetch = self.state(source_name)["next_fetch"]
+        if not next_fetch:
+            return True
+        now = now or datetime.now(timezone.utc)
+        return now >= datetime.fromisoformat(next_fetch)
+
+    def record_success(self, source_name, new_items, now=None):
+        now = now or datetime.now(timezone.utc)
+        state = self.state(source_name)
+        state["consecutive_failures"] = 0
+        state["last_success"] = now.isoformat()
+        if state["avg_new_items"] is None:
+            state["avg_new_items"] = float(new_items)
+        else:
+            state["avg_new_items"] = round(AVERAGE_WEIGHT * new_items + (1 - AVERAGE_WEIGHT) * state["avg_new_items"], 3)
+        state["empty_fetches"] = 0 if new_items else state["empty_fetches"] + 1
+
+        if state["empty_fetches"] and state["avg_new_items"] < QUIET_AVERAGE_NEW_ITEMS:
+            wait = backoff(BASE_QUIET_INTERVAL, state["empty_fetches"], MAX_QUIET_INTERVAL)
+            state["next_fetch"] = (now + wait).isoformat()
+            logging.info(f"{source_name} is quiet, next fetch in {wait}")
+        else:
+            state["next_fetch"] = None
+
+    def record_failure(self, source_name, now=None):
+        now = now or datetime.now(timezone.utc)
+        state = self.state(source_name)
+        state["consecutive_failures"] += 1
+        state["last_failure"] = now.isoformat()
+
+        if state["consecutive_failures"] >= FAILURE_THRESHOLD:
+            # Open the circuit; one attempt is allowed again once the cooldown ends
+            streak = state["consecutive_failures"] - FAILURE_THRESHOLD + 1
+            wait = backoff(BASE_COOLDOWN, streak, MAX_COOLDOWN)
+            state["next_fetch"] = (now + wait).isoformat()
+            logging.warning(f"{source_name} failed {state['consecutive_failures']} times in a row, skipping it for {wait}")
+
+    def save(self):
+        write_atomic(self.path, json.dumps(self.sources, indent=4))
+
+
+_source_health = None
+
+
+def get_source_health():
+    global _source_health
+    if _source_health is None:
+        _source_health = SourceHealth()
+    return _source_health
@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+import requests
+import metrics
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from logger import Logger
+from utils import defer_update, write_atomic
+
+logging = Logger.setup_logger(__name__)
+
+# Committed by the workflow together with data.json, so validators carry over
+# between runs
+HTTP_CACHE_PATH = 'http_cache.json'
+REQUEST_TIMEOUT = 30
+# Keep-alive connections kept per host, enough for the concurrent AIDY topics
+POOL_SIZE = 8
+
+# Pullers run concurrently, so all access to the cache goes through this lock
+_lock = threading.Lock()
+_cache = None
+_cache_changed = False
+_session = None
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if os.path.exists(HTTP_CACHE_PATH):
+            try:
+                with open(HTTP_CACHE_PATH, 'r') as f:
+                    _cache = json.load(f)
+            except Exception as e:
+                logging.warning(f"Could not read HTTP cache, starting empty: {e}")
+    return _cache
+
+
+def _get_entry(url):
+    return _get_cache().setdefault(url, {"etag": None, "last_modified": None, "hits": 0, "misses": 0})
+
+
+def get_session():
+    """
+    The session shared by all fetch threads, so connections stay open between
+    fetches and runs of the daemon. It takes no cookies, which leaves its
+    requests nothing to change in the session itself.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def save_cache():
+    """Write the cache if it changed. Called once per run, after the db is saved."""
+    global _cache_changed
+    with _lock:
+        if not _cache_changed:
+            return
+        write_atomic(HTTP_CACHE_PATH, json.dumps(_cache, indent=4, ensure_ascii=False))
+        _cache_changed = False
+
+
+def conditional_get(url, headers=None, stream=False):
+    """
+    GET a feed using the validators stored for its URL.
+    Returns None when the server answers 304 Not Modified, otherwise the response.
+    With stream=True the body is left unread for the caller to consume and close.
+    """
+    global _cache_changed
+    request_headers = dict(headers or {})
+    with _lock:
+        entry = _get_entry(url)
+        if entry["etag"]:
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = get_session().get(url, headers=request_headers, timeout=REQUEST_TIMEOUT, stream=stream)
+
+    with _lock:
+        if response.status_code == 304:
+            entry["hits"] += 1
+            metrics.count("http_cache_hits_total")
+        else:
+            entry["misses"] += 1
+            metrics.count("http_cache_misses_total")
+        _cache_changed = True
+
+    if response.status_code == 304:
+        logging.info(f"Feed not modified since last run: {url} (hits: {entry['hits']}, misses: {entry['misses']})")
+        response.close()
+        return None
+
+    if not response.ok:
+        response.close()
+    response.raise_for_status()
+    return response
+
+
+def store_validators(url, response):
+    """
+    Remember the validators of a processed response. The update is deferred to
+    the fetch stage, which applies it only after the items of the response are
+    saved, so a failed, late or crashed run never hides items behind a 304.
+    """
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+
+    def update():
+        global _cache_changed
+        with _lock:
+            entry = _get_entry(url)
+            entry["etag"] = etag
+            entry["last_modified"] = last_modified
+            _cache_changed = True
+
+    defer_update(update)
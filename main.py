@@ -1,56 +1,161 @@
-import random 
+import os
+import importlib
 from logger import Logger
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from concurrent.futures import wait
+from datetime import datetime, timedelta, timezone
 
-from nyt import pull_from_nyt
-from aidy import pull_from_aidy
-from breaking_defense import pull_from_breaking_defense
-from spacenews import pull_from_spacenews
-from supercluster import pull_from_supercluster
-from vestaboard import push_to_vestaboard
+# Only pay for python-dotenv when there is a .env file to load. This runs before
+# the utils import so settings like DB_BACKEND can come from the file too.
+if os.path.exists('.env'):
+    from dotenv import load_dotenv
+    load_dotenv()
 
-from utils import get_db, save_db, get_time_remaining, generate_report, get_sorted_sources, get_random_recent_item
+from utils import get_db, save_db, get_time_remaining_until, generate_report, collect_updates, submit_daemon
+from store import to_timestamp
+from health import get_source_health
+import metrics
 
 # Set up logging
 logging = Logger.setup_logger(__name__)
 
-load_dotenv()
-
 DB_PATH = 'data.json'
 CURRENT_DATE = datetime.now().strftime('%Y-%m-%d')
 YESTERDAY_DATE = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
 MESSAGE_CHANGE_FREQUENCY = 7
 
+# Deadlines (in seconds) for the concurrent fetch stage. All sources start
+# together, so a source gets the smaller of the two.
+SOURCE_FETCH_TIMEOUT = 60
+FETCH_STAGE_TIMEOUT = 90
+
+# Pullers as "module:function". They are imported on first use, so runs that
+# neither fetch nor push never load requests, selenium or numpy.
 SOURCES = {
-    "supercluster": pull_from_supercluster,
-    "spacenews": pull_from_spacenews,
-    "nyt": pull_from_nyt,
-    "aidy": pull_from_aidy,
-    "breaking_defense": pull_from_breaking_defense,
+    "supercluster": "supercluster:pull_from_supercluster",
+    "spacenews": "spacenews:pull_from_spacenews",
+    "nyt": "nyt:pull_from_nyt",
+    "aidy": "aidy:pull_from_aidy",
+    "breaking_defense": "breaking_defense:pull_from_breaking_defense",
 }
+_pullers = {}
+
+
+def get_puller(source_name):
+    '''Import the pull function of a source the first time it is needed'''
+    if source_name not in _pullers:
+        module_name, function_name = SOURCES[source_name].split(":")
+        _pullers[source_name] = getattr(importlib.import_module(module_name), function_name)
+    return _pullers[source_name]
 
 
 def get_unseen_item_for_source(DB, source_name):
     '''Get and item that has not been shown on the board yet'''
-    for item in DB.get("data", []):
-        if item.get("source") == source_name and not item.get("shown", False):
-            return item
-    return None
+    return DB.next_unseen(source_name)
 
 def fetch_new_items(source, already_seen):
-    '''Fetch new items from source'''
-    return SOURCES[source](already_seen)
+    '''Fetch new items from source, with the state updates to apply once they are saved'''
+    with metrics.span("fetch", source=source), collect_updates() as updates:
+        new_items = get_puller(source)(already_seen)
+    return new_items, updates
+
+def fetch_all_sources(db, source_names):
+    '''
+    Fetch new items from all given sources at the same time and add them to
+    the store in the order of SOURCES. Sources that fail or miss their
+    deadline contribute nothing to this run, and their state updates (cache
+    validators, topic summaries) are dropped; those of the others are applied
+    by save_db. Sources whose circuit is open or that are quiet are not
+    fetched until their next fetch time.
+    '''
+    health = get_source_health()
+    skipped = [source_name for source_name in source_names if not health.should_fetch(source_name)]
+    for source_name in skipped:
+        metrics.count("sources_skipped_total", source=source_name)
+    if skipped:
+        logging.info(f"Not fetching {', '.join(skipped)} until their next fetch time")
+    source_names = [source_name for source_name in source_names if source_name not in skipped]
+    if not source_names:
+        return
+
+    futures = {}
+    for source_name in source_names:
+        # Import here rather than in the workers, so a broken source only drops itself
+        try:
+            get_puller(source_name)
+        except Exception as e:
+            logging.error(f"Could not load the puller for {source_name}: {e!r}")
+            metrics.count("fetch_failures_total", source=source_name)
+            health.record_failure(source_name)
+            continue
+        # Pullers add the ids they return, so each one gets its own copy
+        existing_ids = set(db.ids_for_source(source_name))
+        # Daemon threads, so a puller that misses its deadline is abandoned
+        # rather than joined at exit
+        futures[source_name] = submit_daemon(fetch_new_items, source_name, existing_ids)
+
+    # Results are judged once, at the deadline: anything that finishes later
+    # is ignored, even if it finishes before it is looked at
+    done, _ = wait(futures.values(), timeout=min(SOURCE_FETCH_TIMEOUT, FETCH_STAGE_TIMEOUT))
+
+    for source_name in SOURCES:
+        future = futures.get(source_name)
+        if future is None:
+            continue
+        try:
+            if future not in done:
+                raise TimeoutError(f"no result after {min(SOURCE_FETCH_TIMEOUT, FETCH_STAGE_TIMEOUT)}s")
+            new_items, updates = future.result()
+        except Exception as e:
+            logging.error(f"Fetching from {source_name} failed or timed out: {e!r}")
+            metrics.count("fetch_failures_total", source=source_name)
+            health.record_failure(source_name)
+            continue
+        # Only results that are used may update the state of their source
+        db.after_save.extend(updates)
+        health.record_success(source_name, len(new_items))
+        metrics.count("items_fetched_total", len(new_items), source=source_name)
+        if new_items:
+            logging.info(f"Fetched {len(new_items)} new items from {source_name}")
+            for item in db.add_items(new_items):
+                metrics.count("items_deduped_total", source=source_name)
+                logging.info(f"Suppressed near-duplicate of {item.extra['duplicate_of']}: {item.text}")
+
+    health.save()
+    # Written once per run, after the validators of the used results
+    from http_cache import save_cache
+    db.after_save.append(save_cache)
 
 def get_current_item(db):
     '''Get the current item shown on the board'''
     current_item_id = db.get("current_item_id")
     if not current_item_id:
         return None
-    return next((item for item in db.get("data", []) if item.get("id") == current_item_id), None)
+    return db.get_item(current_item_id)
 
 
-def execute(db):
+def show_item(db, item):
+    '''Push an item to the board and make it the current item if the push worked'''
+    from vestaboard import push_to_vestaboard
+
+    if not push_to_vestaboard(item):
+        return False
+    shown_time = to_timestamp(datetime.now(timezone.utc))
+    db.record_shown(item, shown_time)
+    db.scheduler(SOURCES).record_shown(item, shown_time)
+    db["current_item_id"] = item.id
+    return True
+
+
+def retry_on_next_trigger(db):
+    '''Make the next trigger rotate again instead of waiting a full cycle'''
+    db["trigger_count"] = MESSAGE_CHANGE_FREQUENCY - 1
+
+
+def execute(db, fetch=True):
+    '''
+    Run one trigger: keep, refresh or rotate the item on the board. With
+    fetch=False only items already in the db are considered.
+    '''
     logging.info("Executing steps to fetch new data and push to vestaboard.")
 
     current_item = get_current_item(db)
@@ -58,50 +163,46 @@ def execute(db):
 
     if db["trigger_count"] >= MESSAGE_CHANGE_FREQUENCY:
         db["trigger_count"] = 0
-    elif current_item and current_item['type'] == 'launch':
-        current_item['time_remaining'] = get_time_remaining(current_item['target_datetime'])
-        push_to_vestaboard(current_item)
+    elif current_item and current_item.type == 'launch':
+        current_item.time_remaining = get_time_remaining_until(current_item.target_at)
+        show_item(db, current_item)
         return
-    elif current_item and current_item['type'] != 'launch':
+    elif current_item and current_item.type != 'launch':
         return
 
-    sorted_sources = get_sorted_sources(db)
+    scheduler = db.scheduler(SOURCES)
 
-    for source_name in sorted_sources:
-        logging.info(f"Finding new messages from {source_name}")
-        item = get_unseen_item_for_source(db, source_name)
-        if item:
-            push_to_vestaboard(item)
-            db["current_item_id"] = item["id"]
-            return
+    if fetch:
+        # Fetch every source that would be visited before the first one with a queued item
+        sources_to_fetch = []
+        for source_name in scheduler.sources_by_priority():
+            if get_unseen_item_for_source(db, source_name):
+                break
+            sources_to_fetch.append(source_name)
+        fetch_all_sources(db, sources_to_fetch)
 
-        existing_ids = [itm["id"] for itm in db.get("data", []) if itm.get("source") == source_name]
-        new_items = fetch_new_items(source_name, existing_ids)
-        if not new_items:
-            continue
-
-        db["data"].extend(new_items)
-        item = get_unseen_item_for_source(db, source_name)
-        if item:
-            push_to_vestaboard(item)
-            db["current_item_id"] = item["id"]
-            return
-    
-    for source in sorted_sources:
-        logging.info(f"Finding old messages from {source}")
-        item = get_random_recent_item(db, source)
-        if not item:
-            continue
-        logging.info(f"Pushing random item: {item.get('text', '')}")
-        push_to_vestaboard(item)
-        db["current_item_id"] = item["id"]
-        break
+    item = scheduler.next_item(exclude=db.get("current_item_id"))
+    if not item:
+        logging.info("No item to show.")
+        return
+    logging.info(f"Pushing {item.source} item: {item.text}")
+    if not show_item(db, item):
+        retry_on_next_trigger(db)
 
 def main():
-    db = get_db()
-    execute(db)    
-    generate_report(db)
-    db = save_db(db)
+    try:
+        with metrics.span("load"):
+            db = get_db()
+        # Most triggers keep the current item and return from execute before any
+        # puller or the board client is imported
+        with metrics.span("execute"):
+            execute(db)
+        with metrics.span("report"):
+            generate_report(db)
+        with metrics.span("save"):
+            save_db(db)
+    finally:
+        metrics.flush()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
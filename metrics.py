@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logger import Logger
+
+logging = Logger.setup_logger(__name__)
+
+# One JSON record per run is appended here. Past METRICS_MAX_BYTES the file is
+# moved to METRICS_PATH + ".1" and a new one is started.
+METRICS_PATH = os.getenv('METRICS_PATH', 'metrics.jsonl')
+METRICS_MAX_BYTES = 1_000_000
+# When set, the last run is also written here in the Prometheus text format,
+# e.g. into the directory of node_exporter's textfile collector
+PROMETHEUS_PATH = os.getenv('METRICS_PROMETHEUS_PATH')
+METRIC_PREFIX = 'vestaboard_'
+
+
+def metric_key(name, labels):
+    """Render a metric name and its labels like Prometheus does: name{label="value"}."""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """
+    Timed spans and counters of one run. Pullers record from worker threads,
+    so all updates go through a lock.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.monotonic()
+        self.spans = []
+        self.counters = {}
+
+    @contextmanager
+    def span(self, name, **labels):
+        start = time.monotonic()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            duration_ms = round((time.monotonic() - start) * 1000, 2)
+            with self.lock:
+                self.spans.append({"name": name, "labels": labels, "ms": duration_ms, "ok": ok})
+
+    def count(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self):
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "duration_ms": round((time.monotonic() - self.start) * 1000, 2),
+                "spans": list(self.spans),
+                "counters": dict(self.counters),
+            }
+
+    def prometheus_text(self, record):
+        lines = [
+            f"# TYPE {METRIC_PREFIX}run_duration_seconds gauge",
+            f"{METRIC_PREFIX}run_duration_seconds {record['duration_ms'] / 1000}",
+            f"# TYPE {METRIC_PREFIX}span_duration_seconds gauge",
+        ]
+        # Spans that ran more than once in the run (e.g. in the daemon) are summed
+        span_totals = {}
+        for span in record["spans"]:
+            key = metric_key(f"{METRIC_PREFIX}span_duration_seconds", {"span": span["name"], **span["labels"]})
+            span_totals[key] = span_totals.get(key, 0) + span["ms"] / 1000
+        lines.extend(f"{key} {round(seconds, 6)}" for key, seconds in span_totals.items())
+        # Counters restart with every run, so they are exported as gauges of
+        # the last run; a Prometheus counter must never go down
+        typed = set()
+        for key, value in sorted(record["counters"].items()):
+            name = key.split("{")[0]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} gauge")
+            lines.append(f"{METRIC_PREFIX}{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Log the run record, append it to METRICS_PATH, export it if configured and start a new record."""
+        record = self.record()
+        # The log is what survives runs on a throwaway machine, e.g. in the workflow
+        logging.info(f"Run metrics: {json.dumps(record)}")
+        try:
+            if os.path.exists(METRICS_PATH) and os.path.getsize(METRICS_PATH) > METRICS_MAX_BYTES:
+                os.replace(METRICS_PATH, METRICS_PATH + ".1")
+            with open(METRICS_PATH, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            if PROMETHEUS_PATH:
+                # Written to a temp file and renamed so scrapers never see half a file
+                with open(PROMETHEUS_PATH + ".tmp", "w") as f:
+                    f.write(self.prometheus_text(record))
+                os.replace(PROMETHEUS_PATH + ".tmp", PROMETHEUS_PATH)
+        except OSError as e:
+            logging.warning(f"Could not write metrics: {e}")
+        self.reset()
+        return record
+
+
+_metrics = Metrics()
+
+
+def span(name, **labels):
+    return _metrics.span(name, **labels)
+
+
+def count(name, value=1, **labels):
+    _metrics.count(name, value, **labels)
+
+
+def flush():
+    return _metrics.flush()
@@ -0,0 +1,150 @@
+import os
+import math
+import heapq
+import random
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from store import to_timestamp
+
+# Relative share of board time per source; every source starts from its weight
+SOURCE_WEIGHTS = {
+    "supercluster": 1.0,
+    "spacenews": 1.0,
+    "nyt": 1.0,
+    "aidy": 1.0,
+    "breaking_defense": 1.0,
+}
+DEFAULT_SOURCE_WEIGHT = 1.0
+
+HOUR_US = 60 * 60 * 1_000_000
+# A source's score doubles for every SOURCE_WAIT_DOUBLING it has not been shown
+SOURCE_WAIT_DOUBLING_US = 2 * HOUR_US
+# An item's freshness halves every FRESHNESS_HALF_LIFE
+FRESHNESS_HALF_LIFE_US = 12 * HOUR_US
+# Every time an item was shown divides its score by 2 ** REPEAT_PENALTY, so a
+# repeat competes with items one freshness half life older
+REPEAT_PENALTY = 1.0
+# A source whose best item is a repeat competes as if it had waited this many
+# SOURCE_WAIT_DOUBLINGs less, however often the item was shown. Show counts only
+# rank items within a source, so sources with few new items still rotate.
+SOURCE_REPEAT_PENALTY = 1.0
+# Shown news items fetched longer ago than this are not shown again
+MAX_ITEM_AGE_US = 7 * 24 * HOUR_US
+
+# Set to make tie-breaking reproducible
+SCHEDULER_SEED = os.getenv('SCHEDULER_SEED')
+
+
+def now_timestamp() -> int:
+    return to_timestamp(datetime.now(timezone.utc))
+
+
+class Scheduler:
+    """
+    Chooses what to show next in two steps. Within a source, items are ranked by
+
+        2 ** (-age / FRESHNESS_HALF_LIFE - times shown * REPEAT_PENALTY)
+
+    and that order does not change as time passes, so every source keeps a heap
+    of its items. Across sources, the head items compete by
+
+        source weight * 2 ** (time since the source was last shown / SOURCE_WAIT_DOUBLING
+                              - SOURCE_REPEAT_PENALTY if the head was shown before)
+
+    Freshness and show counts are left out there on purpose: a source that
+    publishes a lot would otherwise crowd out the others. A pick is
+    O(sources) plus O(log n).
+    """
+
+    def __init__(self, db, sources=None, seed=SCHEDULER_SEED):
+        self.db = db
+        # Only these sources are scheduled; items of sources that were removed
+        # or renamed stay in the db but are never picked
+        self.source_names = list(sources) if sources is not None else list(SOURCE_WEIGHTS)
+        self.random = random.Random(seed)
+        # Heap entries: (-key, tie breaker, id, times shown when pushed)
+        self.heaps = defaultdict(list)
+        last_shown = db.get("source_last_shown")
+        if last_shown is None:
+            # First run with a scheduler: derive it once from the history
+            last_shown = {}
+            for item in db["data"]:
+                if item.shown_at:
+                    last_shown[item.source] = max(last_shown.get(item.source, 0), max(item.shown_at))
+            db["source_last_shown"] = last_shown
+        self.last_shown = dict(last_shown)
+        for item in db["data"]:
+            self.add(item, heapify=False)
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    def sources(self):
+        return list(self.source_names)
+
+    def source_key(self, source: str, now: int) -> float:
+        """log2 of the source part of the score."""
+        waited = max(now - self.last_shown.get(source, 0), 0)
+        return math.log2(SOURCE_WEIGHTS.get(source, DEFAULT_SOURCE_WEIGHT)) + waited / SOURCE_WAIT_DOUBLING_US
+
+    def item_key(self, item) -> float:
+        """log2 of the item part of the score, leaving out the term shared by all items."""
+        return item.fetched_at / FRESHNESS_HALF_LIFE_US - REPEAT_PENALTY * item.show_count
+
+    def add(self, item, heapify=True):
+        if item.extra.get("duplicate_of"):
+            return
+        entry = (-self.item_key(item), self.random.random(), item.id, item.show_count)
+        if heapify:
+            heapq.heappush(self.heaps[item.source], entry)
+        else:
+            self.heaps[item.source].append(entry)
+
+    def sources_by_priority(self, now=None):
+        """Source names, the one that waited longest for its weight first."""
+        now = now or now_timestamp()
+        return sorted(self.sources(), key=lambda source: self.source_key(source, now), reverse=True)
+
+    def head(self, source: str, since: int, exclude=None):
+        """Return the best heap entry of a source, dropping outdated entries on the way."""
+        heap = self.heaps[source]
+        skipped = None
+        while heap:
+            neg_key, _, item_id, times_shown = heap[0]
+            item = self.db.get_item(item_id)
+            # Entries of items shown since they were pushed were replaced by a new entry
+            if item is None or item.show_count != times_shown:
+                heapq.heappop(heap)
+                continue
+            # Unseen items and launches (removed once they take place) never age out
+            if item.fetched_at < since and item.shown and item.type != "launch":
+                heapq.heappop(heap)
+                continue
+            if item_id == exclude:
+                skipped = heapq.heappop(heap)
+                continue
+            break
+        best = heap[0] if heap else None
+        if skipped:
+            heapq.heappush(heap, skipped)
+        return best
+
+    def next_item(self, exclude=None, now=None):
+        """Return the best item to show next, other than the `exclude` id, or None."""
+        now = now or now_timestamp()
+        since = now - MAX_ITEM_AGE_US
+        best, best_score = None, None
+        for source in self.sources():
+            entry = self.head(source, since, exclude)
+            if entry is None:
+                continue
+            score = self.source_key(source, now) - (SOURCE_REPEAT_PENALTY if entry[3] else 0)
+            if best_score is None or score > best_score:
+                best, best_score = entry[2], score
+        return self.db.get_item(best) if best else None
+
+    def record_shown(self, item, now=None):
+        """Update the source state and requeue the item with its new show count."""
+        self.last_shown[item.source] = max(now or now_timestamp(), self.last_shown.get(item.source, 0))
+        self.db["source_last_shown"] = dict(self.last_shown)
+        self.add(item)
@@ -0,0 +1,214 @@
+import sys
+import json
+import sqlite3
+from logger import Logger
+from store import ItemStore, MAX_RECENT_SHOWS, SHOWN_HISTORY_DAYS, format_timestamp, parse_timestamp, roll_up_shows
+from datetime import datetime, timezone, timedelta
+
+logging = Logger.setup_logger(__name__)
+
+SQLITE_DB_PATH = 'data.db'
+
+# Top-level db values stored in the meta table
+META_KEYS = ["version", "last_run_datetime", "trigger_count", "current_item_id", "source_last_shown", "shown_history"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    fetched_datetime TEXT NOT NULL,
+    target_datetime TEXT,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_fetched_datetime ON items (fetched_datetime);
+CREATE INDEX IF NOT EXISTS items_target_datetime ON items (target_datetime);
+CREATE TABLE IF NOT EXISTS shown_events (
+    item_id TEXT NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    shown_at TEXT NOT NULL,
+    PRIMARY KEY (item_id, shown_at)
+);
+"""
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or SQLITE_DB_PATH)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def roll_up_events(conn, events):
+    """Add (source, shown_at) events to the daily counts of the shown_history meta value."""
+    if not events:
+        return
+    row = conn.execute("SELECT value FROM meta WHERE key = 'shown_history'").fetchone()
+    history = (json.loads(row[0]) if row else None) or {}
+    for source, shown_time in events:
+        roll_up_shows(history, source, [parse_timestamp(shown_time)])
+    first_day = (datetime.now(timezone.utc).date() - timedelta(days=SHOWN_HISTORY_DAYS)).isoformat()
+    history = {day: counts for day, counts in history.items() if day >= first_day}
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES ('shown_history', ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (json.dumps(history),)
+    )
+
+
+def delete_items(conn, where, params):
+    """Delete the items matching `where`, keeping their shows in the daily counts."""
+    roll_up_events(conn, conn.execute(
+        f"""
+        SELECT items.source, shown_events.shown_at FROM shown_events JOIN items ON items.id = shown_events.item_id
+        WHERE shown_events.item_id IN (SELECT id FROM items WHERE {where})
+        """,
+        params
+    ).fetchall())
+    conn.execute(f"DELETE FROM items WHERE {where}", params)
+
+
+def apply_retention(conn, num_to_keep, reported_until=0):
+    """
+    Drop expired launches and keep today's items plus the most recent
+    `num_to_keep` older ones, using the indexed datetime columns. Every item
+    keeps its latest MAX_RECENT_SHOWS shown events and those after
+    `reported_until`; the shows of dropped items and events go into the daily
+    counts.
+    """
+    now = datetime.now(timezone.utc)
+    today_start = now.strftime('%Y-%m-%dT00:00:00')
+    with conn:
+        delete_items(
+            conn,
+            "target_datetime IS NOT NULL AND target_datetime < ?",
+            (now.isoformat().replace('+00:00', 'Z'),)
+        )
+        delete_items(
+            conn,
+            """
+            fetched_datetime < :today_start AND id NOT IN (
+                SELECT id FROM items WHERE fetched_datetime < :today_start
+                ORDER BY fetched_datetime DESC LIMIT :keep
+            )
+            """,
+            {"today_start": today_start, "keep": num_to_keep}
+        )
+        old_events = conn.execute(
+            """
+            SELECT item_id, source, shown_at FROM (
+                SELECT shown_events.item_id, items.source, shown_events.shown_at, ROW_NUMBER() OVER (
+                    PARTITION BY shown_events.item_id ORDER BY shown_events.shown_at DESC
+                ) AS newer_events
+                FROM shown_events JOIN items ON items.id = shown_events.item_id
+            ) WHERE newer_events > ? AND shown_at <= ?
+            """,
+            (MAX_RECENT_SHOWS, format_timestamp(reported_until))
+        ).fetchall()
+        roll_up_events(conn, [(source, shown_time) for _, source, shown_time in old_events])
+        conn.executemany(
+            "DELETE FROM shown_events WHERE item_id = ? AND shown_at = ?",
+            [(item_id, shown_time) for item_id, _, shown_time in old_events]
+        )
+
+
+def load_db(num_to_keep=None, path=None, reported_until=0):
+    """
+    Read the database into the version 2 dict layout, or None if it is empty.
+    Retention is applied first when `num_to_keep` is given.
+    """
+    conn = connect(path)
+    try:
+        if num_to_keep is not None:
+            apply_retention(conn, num_to_keep, reported_until)
+        meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+        if meta.get("version") != "2":
+            return None
+
+        shown_at = {}
+        for item_id, shown_time in conn.execute("SELECT item_id, shown_at FROM shown_events ORDER BY shown_at"):
+            shown_at.setdefault(item_id, []).append(shown_time)
+
+        data = []
+        for item_id, document in conn.execute("SELECT id, document FROM items ORDER BY position"):
+            item = json.loads(document)
+            if item_id in shown_at:
+                item["shown_at"] = shown_at[item_id]
+            data.append(item)
+    finally:
+        conn.close()
+
+    return {**meta, "data": data}
+
+
+def save_db(db, item_ids=None, path=None):
+    """
+    Upsert the meta values, items and shown_at events of the db. When
+    `item_ids` is given only those items are written. Shown events are only
+    ever added here; retention removes them.
+    """
+    items = [
+        (position, item.to_dict()) for position, item in enumerate(db.get("data", []))
+        if item_ids is None or item.id in item_ids
+    ]
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(db.get(key))) for key in META_KEYS]
+            )
+            conn.executemany(
+                """
+                INSERT INTO items (id, position, source, fetched_datetime, target_datetime, document)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET position = excluded.position, document = excluded.document,
+                    target_datetime = excluded.target_datetime
+                """,
+                [
+                    (
+                        item["id"], position, item["source"], item["fetched_datetime"], item.get("target_datetime"),
+                        json.dumps({k: v for k, v in item.items() if k != "shown_at"}, ensure_ascii=False)
+                    )
+                    for position, item in items
+                ]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO shown_events (item_id, shown_at) VALUES (?, ?)",
+                [(item["id"], shown_time) for _, item in items for shown_time in item.get("shown_at", [])]
+            )
+    finally:
+        conn.close()
+
+
+def export_json(json_path, path=None):
+    """Write the SQLite database in the data.json layout, for the git-persisted workflow."""
+    db = load_db(path=path)
+    if db is None:
+        logging.error("Nothing to export, the SQLite database is empty.")
+        return
+    with open(json_path, 'w') as f:
+        json.dump(db, f, indent=4, ensure_ascii=False)
+    logging.info(f"Exported {len(db['data'])} items to {json_path}")
+
+
+def import_json(json_path, path=None):
+    """Seed the SQLite database from a data.json file."""
+    with open(json_path, 'r') as f:
+        db = json.load(f)
+    save_db(ItemStore(db), path=path)
+    logging.info(f"Imported {len(db.get('data', []))} items from {json_path}")
+
+
+if __name__ == '__main__':
+    # Usage: python sqlite_db.py export|import [data.json]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    json_path = sys.argv[2] if len(sys.argv) > 2 else 'data.json'
+    if command == 'export':
+        export_json(json_path)
+    elif command == 'import':
+        import_json(json_path)
+    else:
+        sys.exit(f"Unknown command: {command}")
@@ -0,0 +1,261 @@
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone, timedelta
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Items keep their show count and only their latest shows; older shows that
+# are already in the report are counted per day and source in db["shown_history"]
+MAX_RECENT_SHOWS = 4
+SHOWN_HISTORY_DAYS = 90
+
+
+def parse_timestamp(value: str) -> int:
+    """Parse an ISO timestamp into integer microseconds since the epoch."""
+    return (datetime.fromisoformat(value.replace("Z", "+00:00")) - EPOCH) // ONE_MICROSECOND
+
+
+def format_timestamp(value: int) -> str:
+    """Format integer microseconds since the epoch like the timestamps in data.json."""
+    return from_timestamp(value).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def to_timestamp(dt: datetime) -> int:
+    return (dt - EPOCH) // ONE_MICROSECOND
+
+
+def from_timestamp(value: int) -> datetime:
+    return EPOCH + value * ONE_MICROSECOND
+
+
+def roll_up_shows(history: dict, source: str, shown_times) -> None:
+    """Add shows to the {day: {source: count}} counts of db["shown_history"]."""
+    for shown_time in shown_times:
+        counts = history.setdefault(from_timestamp(shown_time).strftime('%Y-%m-%d'), {})
+        counts[source] = counts.get(source, 0) + 1
+
+
+class Item:
+    """
+    A board item of db["data"]. Timestamps are parsed once when the item is
+    loaded and kept as integer microseconds since the epoch.
+    """
+    __slots__ = (
+        "id", "source", "text", "source_link", "shown", "type",
+        "target_at", "time_remaining", "fetched_at", "shown_at", "show_count", "extra",
+    )
+
+    def __init__(self, id, source, text, source_link=None, shown=False, type="news",
+                 target_at=None, time_remaining=None, fetched_at=0, shown_at=None, show_count=None, extra=None):
+        self.id = id
+        self.source = source
+        self.text = text
+        self.source_link = source_link
+        self.shown = shown
+        self.type = type
+        self.target_at = target_at
+        self.time_remaining = time_remaining
+        self.fetched_at = fetched_at
+        # The show times not rolled up yet, oldest first
+        self.shown_at = shown_at if shown_at is not None else []
+        self.show_count = show_count if show_count is not None else len(self.shown_at)
+        # Keys this class does not know about, kept so they survive a save
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Item":
+        data = dict(data)
+        target_datetime = data.pop("target_datetime", None)
+        shown_at = [parse_timestamp(shown_time) for shown_time in data.pop("shown_at", [])]
+        return cls(
+            id=data.pop("id"),
+            source=data.pop("source"),
+            text=data.pop("text"),
+            source_link=data.pop("source_link", None),
+            shown=data.pop("shown", False),
+            type=data.pop("type", "news"),
+            target_at=parse_timestamp(target_datetime) if target_datetime else None,
+            time_remaining=data.pop("time_remaining", None),
+            fetched_at=parse_timestamp(data.pop("fetched_datetime")),
+            shown_at=shown_at,
+            # Items saved before show counts were kept have every show in shown_at
+            show_count=data.pop("show_count", len(shown_at)),
+            extra=data,
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize in the version 2 layout of data.json."""
+        data = {
+            "id": self.id,
+            "source": self.source,
+            "text": self.text,
+            "source_link": self.source_link,
+            "shown": self.shown,
+            "type": self.type,
+        }
+        if self.target_at is not None:
+            data["target_datetime"] = format_timestamp(self.target_at)
+        if self.time_remaining is not None:
+            data["time_remaining"] = self.time_remaining
+        data["fetched_datetime"] = format_timestamp(self.fetched_at)
+        if self.shown_at:
+            data["shown_at"] = [format_timestamp(shown_time) for shown_time in self.shown_at]
+        if self.show_count:
+            data["show_count"] = self.show_count
+        data.update(self.extra)
+        return data
+
+    def trim_shown_at(self, reported_until: int) -> list:
+        """
+        Keep the latest MAX_RECENT_SHOWS show times and return the dropped ones.
+        Shows after `reported_until` are not in the report yet and are kept.
+        """
+        if len(self.shown_at) <= MAX_RECENT_SHOWS:
+            return []
+        self.shown_at.sort()
+        older = self.shown_at[:-MAX_RECENT_SHOWS]
+        dropped = [shown_time for shown_time in older if shown_time <= reported_until]
+        if dropped:
+            self.shown_at = [shown_time for shown_time in older if shown_time > reported_until] + \
+                self.shown_at[-MAX_RECENT_SHOWS:]
+        return dropped
+
+    def record_show(self, shown_time: int):
+        self.shown = True
+        self.show_count += 1
+        self.shown_at.append(shown_time)
+
+
+class ItemStore(dict):
+    """
+    The data.json database (version 2 layout) with indexes over db["data"].
+
+    Items must be added through add_items so the indexes stay in sync; to_dict
+    gives back the plain version 2 layout for saving.
+    Changed top-level keys and items are tracked so saving can skip or shrink
+    writes.
+    """
+
+    def __init__(self, db: dict):
+        super().__init__(db)
+        self.dirty_keys = set()
+        self.dirty_item_ids = set()
+        # Set when items were removed or replaced, which only a full write can persist
+        self.needs_full_write = False
+        self.by_id = {}
+        self.ids_by_source = defaultdict(set)
+        # Items not shown yet, per source, in the order they were added
+        self.unseen = defaultdict(OrderedDict)
+        # Built on first use, so runs that neither add nor rotate never pay for them
+        self.similarity = None
+        self.item_scheduler = None
+        # Updates of other state files that must wait until the items are saved
+        self.after_save = []
+        super().__setitem__("data", [
+            item if isinstance(item, Item) else Item.from_dict(item) for item in self.get("data", [])
+        ])
+        for item in self["data"]:
+            self._index(item)
+
+    def __setitem__(self, key, value):
+        if key not in self or self[key] != value:
+            self.dirty_keys.add(key)
+        super().__setitem__(key, value)
+
+    def to_dict(self) -> dict:
+        return {**self, "data": [item.to_dict() for item in self["data"]]}
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.dirty_keys or self.dirty_item_ids or self.needs_full_write)
+
+    @property
+    def items_dirty(self) -> bool:
+        return bool(self.dirty_item_ids or self.needs_full_write)
+
+    def mark_dirty(self, item: Item):
+        """Record that an item was changed in place, e.g. by a push."""
+        self.dirty_item_ids.add(item.id)
+
+    def mark_clean(self):
+        self.dirty_keys.clear()
+        self.dirty_item_ids.clear()
+        self.needs_full_write = False
+
+    def run_after_save(self):
+        updates, self.after_save = self.after_save, []
+        for update in updates:
+            update()
+
+    def _index(self, item: Item):
+        self.by_id[item.id] = item
+        self.ids_by_source[item.source].add(item.id)
+        # Near-duplicates stay known to the pullers but are never shown
+        if item.extra.get("duplicate_of"):
+            return
+        if not item.shown:
+            self.unseen[item.source][item.id] = item
+
+    def similarity_index(self):
+        if self.similarity is None:
+            from dedup import DEDUP_WINDOW_US, SimilarityIndex
+            self.similarity = SimilarityIndex()
+            # Older items can never match a new one
+            since = to_timestamp(datetime.now(timezone.utc)) - DEDUP_WINDOW_US
+            for item in self["data"]:
+                if item.type == "news" and item.fetched_at >= since:
+                    self.similarity.add(item)
+        return self.similarity
+
+    def scheduler(self, sources=None):
+        """The item scheduler, created on first use for the given source names."""
+        if self.item_scheduler is None:
+            from scheduler import Scheduler
+            self.item_scheduler = Scheduler(self, sources)
+        return self.item_scheduler
+
+    def add_items(self, items: list):
+        """
+        Add new items, given as Item records or as dicts in the data.json layout.
+        News items that repeat a recent story get the id of the earlier item in
+        "duplicate_of" and are kept out of the queues; those items are returned.
+        """
+        suppressed = []
+        for item in items:
+            if not isinstance(item, Item):
+                item = Item.from_dict(item)
+            if item.id in self.by_id:
+                continue
+            if item.type == "news":
+                duplicate_of = self.similarity_index().find_duplicate(item)
+                if duplicate_of:
+                    item.extra["duplicate_of"] = duplicate_of
+                    suppressed.append(item)
+            self["data"].append(item)
+            self._index(item)
+            if self.item_scheduler is not None:
+                self.item_scheduler.add(item)
+            self.dirty_item_ids.add(item.id)
+        return suppressed
+
+    def record_shown(self, item: Item, shown_time: int):
+        """Record a show of the item; the daily cleanup rolls it up once it was reported."""
+        item.record_show(shown_time)
+        self.mark_dirty(item)
+
+    def get_item(self, item_id: str):
+        return self.by_id.get(item_id)
+
+    def ids_for_source(self, source: str) -> set:
+        return self.ids_by_source[source]
+
+    def next_unseen(self, source: str):
+        """Return the oldest item of the source that was not shown yet."""
+        queue = self.unseen[source]
+        while queue:
+            item = next(iter(queue.values()))
+            # Items are marked shown by the push, so drop them lazily here
+            if not item.shown:
+                return item
+            queue.popitem(last=False)
+        return None
@@ -1,20 +1,16 @@
 import os
 import re
+import json
 import requests
 from hashlib import md5
 from logger import Logger
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timezone, timedelta
+from typing import List, Dict, Optional, Set, Tuple
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-
-from utils import get_time_remaining
+import metrics
+from http_cache import get_session
+from utils import get_time_remaining, write_atomic
 
 load_dotenv()
 logging = Logger.setup_logger(__name__)
@@ -23,13 +19,33 @@ SOURCE = 'supercluster'
 SANITY_API_URL = os.getenv('SANITY_API_URL')
 SUPERCLUSTER_URL = "https://www.supercluster.com"
 
-def wait_until_not_calculating(driver, css_selector, timeout=30):
-    return WebDriverWait(driver, timeout).until(
-        lambda d: "calculating" not in d.find_element(By.CSS_SELECTOR, css_selector).text.lower()
-    )
+# "direct" resolves the next launch from the Sanity data and only falls back to
+# the browser when that is ambiguous, "browser" always scrapes the homepage.
+LAUNCH_RESOLUTION_MODE = os.getenv('SUPERCLUSTER_RESOLUTION_MODE', 'direct')
+
+# Local launch catalogue, refreshed from Sanity once its TTL (in seconds) expires
+LAUNCH_CACHE_PATH = 'launch_cache.json'
+LAUNCH_CACHE_TTL = int(os.getenv('SUPERCLUSTER_CACHE_TTL', 3600))
+LAUNCH_WINDOW_DAYS = 90
+
+LAUNCH_QUERY = (
+    '*[_type == "launch" && !(_id in path("drafts.**"))'
+    ' && dateTime(launchInfo.launchDate.utc) >= dateTime($from)'
+    ' && dateTime(launchInfo.launchDate.utc) < dateTime($to)]'
+    ' | order(launchInfo.launchDate.utc asc)'
+    ' {"launchMiniDescription": launchInfo.launchMiniDescription, "slug": slug.current, "launchDate": launchInfo.launchDate.utc}'
+)
 
 def fetch_next_launch_details() -> Optional[Tuple[str, str]]:
     """Fetch the Supercluster page and extract the launch message from the header."""
+    # Selenium and BeautifulSoup are only needed for this fallback path
+    from bs4 import BeautifulSoup
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support.ui import WebDriverWait
+
     opts = Options()
     opts.add_argument("--headless")
     opts.add_argument("--no-sandbox")
@@ -63,62 +79,171 @@ def fetch_next_launch_details() -> Optional[Tuple[str, str]]:
     pattern = r"^Next Launch:\d+D:\d+H:\d+M:\d+S(.*)$"
     match = re.match(pattern, header_text)
     if not match:
-        logging.info("Header text did not match expected pattern.", header_text)
+        logging.info(f"Header text did not match expected pattern: {header_text}")
         return None
     launch_message = match.group(1).strip()
     return launch_message, link    
 
 
-def get_launch_item_for_message(message: str, link_from_homepage: str, already_pushed: List[str]) -> Optional[Dict]:
+class LaunchCatalogue:
+    """Upcoming launches with lookups by slug and by mini-description."""
+
+    def __init__(self, launches: List[Dict], fetched_at: datetime):
+        self.launches = [
+            launch for launch in launches
+            if launch.get("launchMiniDescription") and launch.get("slug") and launch.get("launchDate")
+        ]
+        self.fetched_at = fetched_at
+        self.by_slug = {launch["slug"].strip(): launch for launch in self.launches}
+        self.by_description = {launch["launchMiniDescription"].strip(): launch for launch in self.launches}
+
+    def is_fresh(self) -> bool:
+        return datetime.now(timezone.utc) - self.fetched_at < timedelta(seconds=LAUNCH_CACHE_TTL)
+
+    def to_dict(self) -> Dict:
+        return {"fetched_at": self.fetched_at.isoformat(), "launches": self.launches}
+
+
+_catalogue = None
+
+
+def load_cached_catalogue() -> Optional[LaunchCatalogue]:
+    # Long-running processes keep the catalogue in memory
+    if _catalogue is not None:
+        return _catalogue
+    if not os.path.exists(LAUNCH_CACHE_PATH):
+        return None
+    try:
+        with open(LAUNCH_CACHE_PATH, 'r') as f:
+            cached = json.load(f)
+        return LaunchCatalogue(cached["launches"], datetime.fromisoformat(cached["fetched_at"]))
+    except Exception as e:
+        logging.warning(f"Could not read launch cache: {e}")
+        return None
+
+
+def fetch_launches() -> Optional[LaunchCatalogue]:
     """
-    Call the Sanity API to retrieve launch data and return a launch item whose
-    mini-description matches the provided message.
+    Return the launch catalogue, answering from the local cache while it is
+    fresh and querying the Sanity API for the upcoming window otherwise.
     """
-    query = (
-        '\n*[\n  _type == "launch"\n  && !(_id in path("drafts.**"))\n'
-        '  && launchInfo.launchDate.utc match "2025*"\n] | order(launchInfo.launchDate.utc desc) { ... }\n'
-    )
+    global _catalogue
+    catalogue = load_cached_catalogue()
+    if catalogue and catalogue.is_fresh():
+        metrics.count("launch_cache_hits_total")
+        logging.info(f"Using cached launch catalogue with {len(catalogue.launches)} launches.")
+        return catalogue
+
+    now = datetime.now(timezone.utc)
+    params = {
+        'query': LAUNCH_QUERY,
+        '$from': json.dumps(now.strftime('%Y-%m-%dT%H:%M:%SZ')),
+        '$to': json.dumps((now + timedelta(days=LAUNCH_WINDOW_DAYS)).strftime('%Y-%m-%dT%H:%M:%SZ')),
+    }
     try:
-        response = requests.get(SANITY_API_URL, params={'query': query})
+        response = get_session().get(SANITY_API_URL, params=params, timeout=30)
         response.raise_for_status()
     except requests.exceptions.RequestException as err:
         logging.error(f"API request error: {err}")
+        # A stale catalogue is still better than nothing
+        return catalogue
+
+    catalogue = _catalogue = LaunchCatalogue(response.json().get("result", []), now)
+    write_atomic(LAUNCH_CACHE_PATH, json.dumps(catalogue.to_dict(), indent=4, ensure_ascii=False))
+    logging.info(f"Fetched launch catalogue with {len(catalogue.launches)} launches.")
+    return catalogue
+
+
+def find_next_launch(catalogue: LaunchCatalogue) -> Optional[Dict]:
+    """
+    Return the launch with the earliest future launch date, or None when the
+    answer is ambiguous (no future launch, or several launches share that date).
+    """
+    now = datetime.now(timezone.utc)
+    upcoming = []
+    for launch in catalogue.launches:
+        try:
+            launch_dt = datetime.fromisoformat(launch["launchDate"].replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if launch_dt > now:
+            upcoming.append((launch_dt, launch))
+
+    if not upcoming:
+        logging.info("No upcoming launch found in API data.")
+        return None
+
+    upcoming.sort(key=lambda entry: entry[0])
+    if len(upcoming) > 1 and upcoming[0][0] == upcoming[1][0]:
+        logging.info("Several launches share the next launch date.")
+        return None
+    return upcoming[0][1]
+
+
+def build_launch_item(launch: Dict, already_pushed: Set[str]) -> Optional[Dict]:
+    """Turn a Sanity launch document into a board item, unless it was already pushed."""
+    message = launch["launchMiniDescription"].strip()
+    slug = launch["slug"].strip()
+
+    item_id = md5((SOURCE + message).encode()).hexdigest()
+    if item_id in already_pushed:
+        logging.info(f"Skipping already processed item with id: {item_id}")
         return None
+    launch_date = launch["launchDate"]
+    return {
+        "id": item_id,
+        "source": SOURCE,
+        "text": message,
+        "source_link": f"{SUPERCLUSTER_URL}/launches/{slug}",
+        "shown": False,
+        "type": "launch",
+        "target_datetime": launch_date,
+        "time_remaining": get_time_remaining(launch_date),
+        "fetched_datetime": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    }
+
 
-    data = response.json()
-    for launch in data.get("result", []):
-        mini_desc = launch["launchInfo"]["launchMiniDescription"].strip()
-        slug = launch["slug"]["current"].strip()
-        link = f"{SUPERCLUSTER_URL}/launches/{slug}"
-
-        if message == mini_desc and link == link_from_homepage:
-            item_id = md5((SOURCE + message).encode()).hexdigest()
-            if item_id in already_pushed:
-                logging.info(f"Skipping already processed item with id: {item_id}")
-                return None
-            launch_date = launch["launchInfo"]["launchDate"]["utc"]
-            return {
-                "id": item_id,
-                "source": SOURCE,
-                "text": message,
-                "source_link": link,
-                "shown": False,
-                "type": "launch",
-                "target_datetime": launch_date,
-                "time_remaining": get_time_remaining(launch_date),
-                "fetched_datetime": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-            }
+def get_launch_item_for_message(message: str, link_from_homepage: str, already_pushed: Set[str],
+                                catalogue: Optional[LaunchCatalogue] = None) -> Optional[Dict]:
+    """
+    Return a launch item whose mini-description matches the provided message,
+    looked up in the given launch catalogue or a freshly loaded one.
+    """
+    if catalogue is None:
+        catalogue = fetch_launches()
+        if catalogue is None:
+            return None
+
+    slug = link_from_homepage.rsplit('/launches/', 1)[-1]
+    launch = catalogue.by_description.get(message)
+    if launch and catalogue.by_slug.get(slug) is launch:
+        return build_launch_item(launch, already_pushed)
     logging.info("No matching launch found in API data.")
     return None
 
-def pull_from_supercluster(already_pushed: List[str]) -> List[Dict]:
+def pull_from_supercluster(already_pushed: Set[str]) -> List[Dict]:
     """
-    Pulls a launch item from Supercluster by first extracting the header message,
-    then querying the API for a matching launch.
+    Pulls the next launch item from Supercluster. The launch is resolved from the
+    Sanity API data; the homepage is only scraped when that is ambiguous.
     """
-    message, link = fetch_next_launch_details()
-    if not message:
+    catalogue = fetch_launches()
+    if catalogue is None:
+        raise RuntimeError("No launch data available from Sanity")
+
+    if LAUNCH_RESOLUTION_MODE == 'direct':
+        launch = find_next_launch(catalogue)
+        if launch:
+            launch_item = build_launch_item(launch, already_pushed)
+            return [launch_item] if launch_item else []
+        logging.info("Falling back to the Supercluster homepage.")
+
+    try:
+        details = fetch_next_launch_details()
+    except Exception as e:
+        raise RuntimeError(f"Could not scrape the Supercluster homepage: {e}") from e
+    if not details:
         logging.info("No header message extracted.")
         return []
-    launch_item = get_launch_item_for_message(message, link, already_pushed)
-    return [launch_item] if launch_item else []
\ No newline at end of file
+    message, link = details
+    launch_item = get_launch_item_for_message(message, link, already_pushed, catalogue)
+    return [launch_item] if launch_item else []
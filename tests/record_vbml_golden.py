@@ -0,0 +1,44 @@
+"""
+Record what the VBML compose API returns for the templates the board uses,
+as golden outputs for tests/test_vbml.py:
+
+    VESTABOARD_API_KEY=... python tests/record_vbml_golden.py
+
+The committed outputs were laid out by hand from the VBML layout rules (word
+wrap, centered block, overlays drawn last); recording replaces them.
+"""
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vestaboard import SOURCE_COLORS, format_rest_message, get_client
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vbml_golden.json")
+
+# (message, source, time remaining) covering short, wrapped, truncated and launch items
+CASES = [
+    ("Short headline", "nyt", ""),
+    ("SpaceX launches another batch of Starlink satellites from Vandenberg", "spacenews", ""),
+    ("Space Force awards $1.2 billion contract for missile tracking satellites to three companies "
+     "after a long competition that drew bids from most of the industry", "breaking_defense", ""),
+    ("It’s “official”: the agency’s budget – again – is late", "aidy", ""),
+    ("Falcon 9 | Starlink Group 10-5", "supercluster", "0d 03h 25m"),
+    ("Electron | Owl Night Continues Again for Synspective Customer", "supercluster", "12d 00h 01m"),
+]
+
+
+def main():
+    client = get_client()
+    golden = []
+    for message, source, time_remaining in CASES:
+        vbml = format_rest_message(message=message, color=SOURCE_COLORS[source], time_remaining=time_remaining)
+        golden.append({"vbml": vbml, "characters": client.compose(vbml)})
+    with open(GOLDEN_PATH, "w") as f:
+        json.dump(golden, f, indent=2, ensure_ascii=False)
+    print(f"Recorded {len(golden)} outputs to {GOLDEN_PATH}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import countdown
+import frame_cache
+import vestaboard
+from countdown import Countdown
+from frame import char_to_code
+from frame_cache import FrameCache
+from store import Item
+
+
+class FakeClient:
+    def __init__(self):
+        self.pushes = []
+
+    def send(self, characters):
+        self.pushes.append(characters)
+
+
+def setup(tmp_path, monkeypatch, times):
+    client = FakeClient()
+    remaining = iter(times)
+    monkeypatch.setattr(countdown, "get_client", lambda: client)
+    monkeypatch.setattr(countdown, "get_time_remaining_until", lambda target_at: next(remaining))
+    monkeypatch.setattr(frame_cache, "_frame_cache", FrameCache(path=str(tmp_path / "frame_cache.json")))
+    monkeypatch.setattr(vestaboard, "VBML_RENDERER", "local")
+    return client
+
+
+def countdown_cells(characters):
+    return characters[5][6:18]
+
+
+def codes(text):
+    return [char_to_code[char] for char in text]
+
+
+def test_pushes_only_when_the_minute_changes(tmp_path, monkeypatch):
+    client = setup(tmp_path, monkeypatch, ["0d 03h 25m", "0d 03h 25m", "0d 03h 24m"])
+    launch = Item("l", "supercluster", "Falcon 9 | Starlink Group 10-5", type="launch", target_at=1)
+    refresher = Countdown()
+
+    assert refresher.refresh(launch)
+    assert not refresher.refresh(launch)
+    assert refresher.refresh(launch)
+    first, second = client.pushes
+    assert countdown_cells(first) == codes("0D 03H 25M  ")
+    assert countdown_cells(second) == codes("0D 03H 24M  ")
+    # Only the countdown cells were redrawn
+    assert first[:5] == second[:5]
+    assert first[5][:6] + first[5][18:] == second[5][:6] + second[5][18:]
+
+
+def test_news_items_and_past_launches_are_left_alone(tmp_path, monkeypatch):
+    client = setup(tmp_path, monkeypatch, [""])
+    refresher = Countdown()
+    assert not refresher.refresh(Item("n", "nyt", "News"))
+    assert not refresher.refresh(None)
+    assert not refresher.refresh(Item("l", "supercluster", "Launched", type="launch", target_at=1))
+    assert client.pushes == []
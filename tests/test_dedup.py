@@ -0,0 +1,51 @@
+from dedup import (DEDUP_WINDOW_US, SAME_SOURCE_SIMILARITY_THRESHOLD, SIMILARITY_THRESHOLD, SimilarityIndex, jaccard,
+                   words)
+from store import Item
+
+LEOLABS = "LeoLabs deploys mobile space-tracking radar in Indo-Pacific "
+LEOLAB = "LeoLab’s new, mobile space-watch radar to participate in Valiant Shield exercise"
+HOUR_US = 60 * 60 * 1_000_000
+
+
+def find(index, id, source, text, fetched_at=0):
+    return index.find_duplicate(Item(id, source, text, fetched_at=fetched_at))
+
+
+def test_reworded_story_from_another_outlet_is_a_duplicate():
+    index = SimilarityIndex()
+    assert find(index, "a", "spacenews", LEOLABS) is None
+    assert find(index, "b", "breaking_defense", LEOLAB, fetched_at=HOUR_US) == "a"
+    # Clears the threshold by a margin rather than by rounding
+    assert jaccard(words(LEOLABS), words(LEOLAB)) >= SIMILARITY_THRESHOLD + 0.05
+
+
+def test_different_numbers_are_different_stories():
+    index = SimilarityIndex()
+    assert find(index, "a", "spacenews", "Day 2 of the 2026 Space and Missile Defense Symposium") is None
+    assert find(index, "b", "spacenews", "Day 3 of the 2026 Space and Missile Defense Symposium") is None
+    assert find(index, "c", "nyt", "Day 3 of the 2026 Space and Missile Defense Symposium") == "b"
+
+
+def test_one_outlet_needs_a_closer_match():
+    title = "Botswana signs the Artemis Accords"
+    reuse = "Serbia signs the Artemis Accords"
+    assert SIMILARITY_THRESHOLD <= jaccard(words(title), words(reuse)) < SAME_SOURCE_SIMILARITY_THRESHOLD
+
+    index = SimilarityIndex()
+    find(index, "a", "spacenews", title)
+    # A template the outlet reuses for another story
+    assert find(index, "b", "spacenews", reuse) is None
+    # The same headline with an edit
+    assert find(index, "c", "spacenews", "Botswana Signs the Artemis Accords.") == "a"
+
+
+def test_unrelated_titles_are_kept():
+    index = SimilarityIndex()
+    find(index, "a", "spacenews", LEOLABS)
+    assert find(index, "b", "nyt", "Rocket Lab to acquire Iridium") is None
+
+
+def test_only_recent_items_are_compared():
+    index = SimilarityIndex()
+    find(index, "a", "spacenews", LEOLABS)
+    assert find(index, "b", "breaking_defense", LEOLAB, fetched_at=DEDUP_WINDOW_US + 1) is None
@@ -0,0 +1,67 @@
+import io
+from datetime import timedelta
+
+import feeds
+from feeds import RSS_DATE_FORMAT, FeedSource, iter_feed_items
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.raw = io.BytesIO(body)
+        self.headers = {}
+
+    def close(self):
+        pass
+
+
+def rss(items):
+    """An RSS body with (title, pubDate) items; a None date leaves out the pubDate."""
+    body = "".join(
+        f"<item><title>{title}</title><link>https://example.com/{n}</link>"
+        + (f"<pubDate>{published.strftime(RSS_DATE_FORMAT)}</pubDate>" if published else "")
+        + "</item>"
+        for n, (title, published) in enumerate(items)
+    )
+    return f'<?xml version="1.0"?><rss><channel><title>t</title>{body}</channel></rss>'.encode()
+
+
+def test_cutoff_is_utc_midnight():
+    source = FeedSource("test", "https://example.com/feed", max_age_days=2)
+    cutoff = source.cutoff()
+    assert cutoff.utcoffset() == timedelta(0)
+    assert (cutoff.hour, cutoff.minute, cutoff.second, cutoff.microsecond) == (0, 0, 0, 0)
+
+
+def test_filter_compares_across_time_zones():
+    source = FeedSource("test", "https://example.com/feed")
+    cutoff = source.cutoff()
+    # 23:30 at UTC-5 the evening before is 04:30 UTC today
+    after = (cutoff + timedelta(hours=4, minutes=30)).astimezone(feeds.timezone(timedelta(hours=-5)))
+    # 01:00 at UTC+2 today is 23:00 UTC yesterday
+    before = (cutoff - timedelta(hours=1)).astimezone(feeds.timezone(timedelta(hours=2)))
+    # By the local dates alone the order would be the other way round
+    assert after.date() < before.date()
+    items = list(iter_feed_items(FakeResponse(rss([("After", after), ("Before", before)]))))
+    assert [source.accepts(item, cutoff) for item in items] == [True, False]
+
+
+def test_early_stop_uses_the_same_cutoff():
+    source = FeedSource("test", "https://example.com/feed")
+    cutoff = source.cutoff()
+    fresh = (cutoff + timedelta(minutes=5)).astimezone(feeds.timezone(timedelta(hours=-8)))
+    stale = (cutoff - timedelta(minutes=5)).astimezone(feeds.timezone(timedelta(hours=9)))
+    body = rss([("A", fresh), ("B", stale), ("C", fresh), ("D", stale), ("E", stale), ("F", stale), ("G", fresh)])
+    titles = [item.title for item in iter_feed_items(FakeResponse(body), cutoff)]
+    # One stale item in a row is skipped, three stop the feed
+    assert titles == ["A", "C"]
+
+
+def test_items_without_a_date_are_skipped(monkeypatch):
+    source = FeedSource("test", "https://example.com/feed")
+    fresh = source.cutoff() + timedelta(hours=1)
+    body = rss([("Dated", fresh), ("Undated", None), ("Also dated", fresh)])
+    monkeypatch.setattr(feeds, "conditional_get", lambda *args, **kwargs: FakeResponse(body))
+    monkeypatch.setattr(feeds, "store_validators", lambda *args: None)
+    items = source.pull(set())
+    assert [item["text"] for item in items] == ["Dated", "Also dated"]
+    assert source.stats["filtered"] == 1
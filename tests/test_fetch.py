@@ -0,0 +1,58 @@
+import time
+
+import dedup  # noqa: F401 - imported up front so only the fetch stage is timed
+import health
+import http_cache
+import main
+from store import Item, ItemStore
+from utils import defer_update
+
+
+def make_puller(delay, applied):
+    def pull(already_seen):
+        time.sleep(delay)
+        defer_update(lambda: applied.append(delay))
+        return [Item(f"item-{delay}", "test", f"after {delay}s")]
+    return pull
+
+
+def test_results_after_the_source_deadline_are_dropped(tmp_path, monkeypatch):
+    applied = []
+    pullers = {"fast": make_puller(0, applied), "late": make_puller(0.6, applied)}
+    monkeypatch.setattr(main, "SOURCES", {name: "unused:unused" for name in pullers})
+    monkeypatch.setattr(main, "_pullers", pullers)
+    monkeypatch.setattr(main, "SOURCE_FETCH_TIMEOUT", 0.3)
+    monkeypatch.setattr(main, "FETCH_STAGE_TIMEOUT", 2)
+    monkeypatch.setattr(health, "_source_health", health.SourceHealth(path=str(tmp_path / "health.json")))
+    db = ItemStore({"version": "2", "data": []})
+
+    start = time.monotonic()
+    main.fetch_all_sources(db, list(pullers))
+    assert time.monotonic() - start < 0.5
+    assert [item.id for item in db["data"]] == ["item-0"]
+
+    # A late result is not merged even when it is done by the time it is looked at
+    time.sleep(0.5)
+    db.after_save = [update for update in db.after_save if update is not http_cache.save_cache]
+    db.run_after_save()
+    assert applied == [0]
+    assert health.get_source_health().state("late")["consecutive_failures"] == 1
+
+
+def test_unchanged_sources_are_skipped_until_their_next_fetch(tmp_path, monkeypatch):
+    calls = []
+
+    def not_modified(already_seen):
+        # What a puller returns when its feed answers 304
+        calls.append(1)
+        return []
+
+    monkeypatch.setattr(main, "SOURCES", {"quiet": "unused:unused"})
+    monkeypatch.setattr(main, "_pullers", {"quiet": not_modified})
+    monkeypatch.setattr(health, "_source_health", health.SourceHealth(path=str(tmp_path / "health.json")))
+    db = ItemStore({"version": "2", "data": []})
+
+    main.fetch_all_sources(db, ["quiet"])
+    main.fetch_all_sources(db, ["quiet"])
+    assert len(calls) == 1
+    assert health.get_source_health().state("quiet")["empty_fetches"] == 1
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from health import BASE_COOLDOWN, BASE_QUIET_INTERVAL, FAILURE_THRESHOLD, MAX_COOLDOWN, MAX_QUIET_INTERVAL, SourceHealth
+
+NOW = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+SECOND = timedelta(seconds=1)
+
+
+@pytest.fixture
+def health(tmp_path):
+    return SourceHealth(path=str(tmp_path / "source_health.json"))
+
+
+def fail(health, times, now=NOW):
+    for _ in range(times):
+        health.record_failure("nyt", now=now)
+
+
+def test_circuit_opens_at_the_failure_threshold(health):
+    fail(health, FAILURE_THRESHOLD - 1)
+    assert health.should_fetch("nyt", now=NOW)
+    fail(health, 1)
+    assert not health.should_fetch("nyt", now=NOW)
+    assert not health.should_fetch("nyt", now=NOW + BASE_COOLDOWN - SECOND)
+    # One attempt is allowed once the cooldown ends
+    assert health.should_fetch("nyt", now=NOW + BASE_COOLDOWN)
+
+
+def test_cooldown_doubles_up_to_the_limit(health):
+    fail(health, FAILURE_THRESHOLD)
+    cooldowns = []
+    for _ in range(8):
+        fail(health, 1)
+        next_fetch = datetime.fromisoformat(health.state("nyt")["next_fetch"])
+        cooldowns.append(next_fetch - NOW)
+    assert cooldowns[:3] == [BASE_COOLDOWN * 2, BASE_COOLDOWN * 4, BASE_COOLDOWN * 8]
+    assert cooldowns[-1] == MAX_COOLDOWN
+
+
+def test_success_closes_the_circuit(health):
+    fail(health, FAILURE_THRESHOLD)
+    health.record_success("nyt", 3, now=NOW + BASE_COOLDOWN)
+    assert health.state("nyt")["consecutive_failures"] == 0
+    assert health.should_fetch("nyt", now=NOW + BASE_COOLDOWN)
+    # It takes the full threshold to open it again
+    fail(health, FAILURE_THRESHOLD - 1)
+    assert health.should_fetch("nyt", now=NOW + BASE_COOLDOWN)
+
+
+def test_quiet_sources_back_off(health):
+    health.record_success("nyt", 0, now=NOW)
+    assert not health.should_fetch("nyt", now=NOW + BASE_QUIET_INTERVAL - SECOND)
+    assert health.should_fetch("nyt", now=NOW + BASE_QUIET_INTERVAL)
+    waits = []
+    for _ in range(6):
+        health.record_success("nyt", 0, now=NOW)
+        waits.append(datetime.fromisoformat(health.state("nyt")["next_fetch"]) - NOW)
+    assert waits[:2] == [BASE_QUIET_INTERVAL * 2, BASE_QUIET_INTERVAL * 4]
+    assert waits[-1] == MAX_QUIET_INTERVAL
+
+
+def test_unchanged_feeds_count_as_quiet(health):
+    # A 304 or a fetch with nothing new is recorded as a success with 0 items
+    health.record_success("nyt", 0, now=NOW)
+    assert health.state("nyt")["empty_fetches"] == 1
+    assert not health.should_fetch("nyt", now=NOW)
+
+
+def test_busy_sources_are_not_backed_off(health):
+    health.record_success("nyt", 4, now=NOW)
+    # One empty fetch does not make a source with a high average quiet
+    health.record_success("nyt", 0, now=NOW)
+    assert health.state("nyt")["next_fetch"] is None
+    assert health.should_fetch("nyt", now=NOW)
+    health.record_success("nyt", 2, now=NOW)
+    assert health.state("nyt")["empty_fetches"] == 0
+
+
+def test_state_survives_a_save(health):
+    fail(health, FAILURE_THRESHOLD)
+    health.save()
+    reloaded = SourceHealth(path=health.path)
+    assert not reloaded.should_fetch("nyt", now=NOW)
+    assert reloaded.state("nyt")["consecutive_failures"] == FAILURE_THRESHOLD
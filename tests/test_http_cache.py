@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_cache
+from utils import submit_daemon
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    clients = set()
+
+    def do_GET(self):
+        FeedHandler.clients.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.send_header("Set-Cookie", "session=abc")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/feed"
+    server.shutdown()
+
+
+def test_fetch_threads_share_kept_alive_connections(feed_url, monkeypatch, tmp_path):
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_PATH", str(tmp_path / "http_cache.json"))
+    FeedHandler.clients.clear()
+
+    # Every fetch runs in a new thread, like the pullers and the AIDY topics
+    for _ in range(5):
+        futures = [submit_daemon(http_cache.conditional_get, feed_url) for _ in range(3)]
+        wait(futures)
+        assert all(future.result().text == "ok" for future in futures)
+
+    assert len(FeedHandler.clients) <= 3
+    assert not http_cache.get_session().cookies
@@ -0,0 +1,113 @@
+from collections import Counter
+
+from scheduler import HOUR_US, MAX_ITEM_AGE_US, Scheduler
+from store import Item, ItemStore
+
+NOW = 1_800_000_000 * 1_000_000
+SOURCES = ["supercluster", "spacenews", "nyt", "aidy", "breaking_defense"]
+ROTATION_US = 70 * 60 * 1_000_000
+
+
+def make_item(id, source, age_hours, shown=(), type="news"):
+    """An item fetched `age_hours` ago, shown at the given hours ago."""
+    shown_at = sorted(NOW - int(hours * HOUR_US) for hours in shown)
+    return Item(id, source, f"{source} {id}", shown=bool(shown_at), type=type,
+                fetched_at=NOW - int(age_hours * HOUR_US), shown_at=shown_at)
+
+
+def make_scheduler(items, sources=SOURCES):
+    db = ItemStore({"version": "2", "data": items})
+    return db, Scheduler(db, sources, seed=1)
+
+
+def rotate(db, scheduler, picks):
+    """Pick and show `picks` items, one every ROTATION_US, and return them."""
+    shown = []
+    current = None
+    for n in range(picks):
+        now = NOW + n * ROTATION_US
+        item = scheduler.next_item(exclude=current, now=now)
+        if item is None:
+            break
+        db.record_shown(item, now)
+        scheduler.record_shown(item, now)
+        current = item.id
+        shown.append(item)
+    return shown
+
+
+def test_sources_rotate_when_one_source_has_most_new_items():
+    items = [make_item(f"s{n}", "spacenews", age_hours=n / 4) for n in range(40)]
+    # The other sources only have older items that were shown several times
+    items += [make_item(f"n{n}", "nyt", age_hours=30 + n, shown=(20, 10, 5)) for n in range(3)]
+    items += [make_item(f"b{n}", "breaking_defense", age_hours=40 + n, shown=(25, 12, 6, 3)) for n in range(3)]
+    db, scheduler = make_scheduler(items)
+
+    picks = [item.source for item in rotate(db, scheduler, 30)]
+    counts = Counter(picks)
+    assert set(counts) == {"spacenews", "nyt", "breaking_defense"}
+    # New items earn spacenews a bounded edge, not the whole board
+    assert counts["spacenews"] <= 16
+    assert min(counts.values()) >= 7
+    # No source waits for more than three other picks
+    for source in counts:
+        positions = [n for n, pick in enumerate(picks) if pick == source]
+        assert positions[0] <= 3
+        assert max(b - a for a, b in zip(positions, positions[1:])) <= 4
+
+
+def test_new_items_first_and_freshest_first_within_a_source():
+    items = [
+        make_item("repeat", "nyt", age_hours=1, shown=(0.5,)),
+        make_item("older", "nyt", age_hours=8),
+        make_item("newer", "nyt", age_hours=2),
+        make_item("stale", "nyt", age_hours=20),
+    ]
+    db, scheduler = make_scheduler(items)
+    assert scheduler.next_item(now=NOW).id == "newer"
+    assert scheduler.next_item(exclude="newer", now=NOW).id == "older"
+    # A show costs as much as one freshness half life
+    picks = [item.id for item in rotate(db, scheduler, 4)]
+    assert picks == ["newer", "older", "repeat", "newer"]
+
+
+def test_longest_waiting_source_goes_first():
+    items = [
+        make_item("a", "nyt", age_hours=1, shown=(1,)),
+        make_item("b", "nyt", age_hours=1),
+        make_item("c", "spacenews", age_hours=30, shown=(8,)),
+        make_item("d", "spacenews", age_hours=30),
+    ]
+    db, scheduler = make_scheduler(items)
+    order = scheduler.sources_by_priority(now=NOW)
+    assert order.index("spacenews") < order.index("nyt")
+    # Freshness does not count across sources
+    assert scheduler.next_item(now=NOW).id == "d"
+
+
+def test_age_limit_spares_unseen_items_and_launches():
+    too_old = MAX_ITEM_AGE_US / HOUR_US + 1
+    items = [
+        make_item("old-shown", "nyt", age_hours=too_old, shown=(too_old - 1,)),
+        make_item("old-unseen", "spacenews", age_hours=too_old),
+        make_item("old-launch", "supercluster", age_hours=too_old, shown=(too_old - 1,), type="launch"),
+    ]
+    db, scheduler = make_scheduler(items)
+    picks = {item.id for item in [scheduler.next_item(now=NOW), scheduler.next_item(exclude="old-unseen", now=NOW)]}
+    assert picks == {"old-unseen", "old-launch"}
+    assert scheduler.next_item(exclude="old-launch", now=NOW + 3 * ROTATION_US).id == "old-unseen"
+
+
+def test_unregistered_sources_are_never_scheduled():
+    items = [make_item("gone", "retired_source", age_hours=1), make_item("kept", "nyt", age_hours=5)]
+    db, scheduler = make_scheduler(items)
+    assert "retired_source" not in scheduler.sources_by_priority(now=NOW)
+    assert scheduler.next_item(now=NOW).id == "kept"
+    assert scheduler.next_item(exclude="kept", now=NOW) is None
+
+
+def test_picks_are_reproducible_with_a_seed():
+    items = [make_item(f"{source}{n}", source, age_hours=1) for source in SOURCES for n in range(3)]
+    first = [item.id for item in rotate(*make_scheduler(items), 10)]
+    items = [make_item(f"{source}{n}", source, age_hours=1) for source in SOURCES for n in range(3)]
+    assert [item.id for item in rotate(*make_scheduler(items), 10)] == first
@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import sqlite_db
+import utils
+from store import MAX_RECENT_SHOWS, Item, ItemStore, format_timestamp, to_timestamp
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOW = to_timestamp(datetime.now(timezone.utc))
+MINUTE_US = 60 * 1_000_000
+
+
+def make_item(id, source="nyt", shows=0, **kwargs):
+    """A news item fetched an hour ago, shown `shows` times a minute apart up to now."""
+    shown_at = [NOW - (shows - 1 - n) * MINUTE_US for n in range(shows)]
+    return Item(id, source, f"text {id}", fetched_at=NOW - 60 * MINUTE_US, shown=bool(shown_at),
+                shown_at=shown_at, **kwargs)
+
+
+def test_item_round_trip():
+    item = make_item("a", shows=2, source_link="https://example.com", extra={"duplicate_of": "b"})
+    item.show_count = 7
+    data = item.to_dict()
+    assert data["shown_at"] == [format_timestamp(shown_time) for shown_time in item.shown_at]
+    assert data["duplicate_of"] == "b"
+    copy = Item.from_dict(json.loads(json.dumps(data)))
+    assert copy.to_dict() == data
+    assert (copy.show_count, copy.shown_at, copy.extra) == (7, item.shown_at, {"duplicate_of": "b"})
+
+
+def test_launch_round_trip():
+    launch = Item("l", "supercluster", "Falcon 9", type="launch", target_at=NOW, fetched_at=NOW)
+    data = launch.to_dict()
+    assert "shown_at" not in data and "show_count" not in data
+    assert Item.from_dict(data).target_at == NOW
+
+
+def test_show_count_of_older_files_is_the_number_of_shows():
+    data = make_item("a", shows=3).to_dict()
+    del data["show_count"]
+    assert Item.from_dict(data).show_count == 3
+
+
+def test_add_items_indexes_and_tracks_changes():
+    db = ItemStore({"version": "2", "data": [make_item("old", shows=1).to_dict()]})
+    assert not db.is_dirty
+    db.add_items([make_item("new")])
+    assert db.get_item("new").source == "nyt"
+    assert db.ids_for_source("nyt") == {"old", "new"}
+    assert list(db.unseen["nyt"]) == ["new"]
+    assert db.dirty_item_ids == {"new"}
+
+    db.mark_clean()
+    item = db.get_item("new")
+    db.record_shown(item, NOW)
+    assert (item.shown, item.show_count, item.shown_at) == (True, 1, [NOW])
+    assert db.dirty_item_ids == {"new"}
+    assert db.to_dict()["data"][1]["shown_at"] == [format_timestamp(NOW)]
+
+
+def test_shows_are_only_trimmed_once_reported():
+    item = make_item("a", shows=MAX_RECENT_SHOWS + 3)
+    shown_at = list(item.shown_at)
+    # Nothing reported yet: every show is kept
+    assert item.trim_shown_at(0) == []
+    # Two of the three older shows were reported
+    assert item.trim_shown_at(shown_at[1]) == shown_at[:2]
+    assert item.shown_at == shown_at[2:]
+    assert item.trim_shown_at(NOW) == shown_at[2:3]
+    assert len(item.shown_at) == MAX_RECENT_SHOWS
+
+
+def test_migration_reports_every_show(tmp_path, monkeypatch):
+    """Loading the committed data.json with no report yet archives all of its shows."""
+    shutil.copy(os.path.join(REPO, "data.json"), tmp_path / "data.json")
+    shows = sum(len(item.get("shown_at", [])) for item in json.loads((tmp_path / "data.json").read_text())["data"])
+    monkeypatch.chdir(tmp_path)
+
+    db = utils.get_db()
+    assert sum(len(item.shown_at) for item in db["data"]) == shows
+    utils.generate_report(db)
+    utils.save_db(db)
+    archived = sum(len((tmp_path / "reports" / name).read_text().splitlines())
+                   for name in os.listdir(tmp_path / "reports"))
+    assert archived == shows
+
+    # The next day's cleanup may roll up what was reported
+    db = utils.get_db()
+    db["last_run_datetime"] = "2000-01-01T00:00:00+00:00"
+    db = utils.cleanup_db(db)
+    assert max(len(item.shown_at) for item in db["data"]) <= MAX_RECENT_SHOWS
+
+
+def test_sqlite_keeps_unreported_shows(tmp_path):
+    path = str(tmp_path / "data.db")
+    db = ItemStore({"version": "2", "data": [make_item("a", shows=MAX_RECENT_SHOWS + 2)]})
+    shown_at = list(db.get_item("a").shown_at)
+    sqlite_db.save_db(db, path=path)
+
+    loaded = sqlite_db.load_db(num_to_keep=10, path=path, reported_until=0)
+    assert len(loaded["data"][0]["shown_at"]) == MAX_RECENT_SHOWS + 2
+    loaded = sqlite_db.load_db(num_to_keep=10, path=path, reported_until=shown_at[0])
+    assert loaded["data"][0]["shown_at"] == [format_timestamp(shown_time) for shown_time in shown_at[1:]]
+    history = loaded["shown_history"]
+    assert sum(counts["nyt"] for counts in history.values()) == 1
+
+    # Saving an item only adds its new shows
+    item = Item.from_dict(loaded["data"][0])
+    store = ItemStore({**loaded, "data": [item]})
+    store.record_shown(item, NOW + MINUTE_US)
+    sqlite_db.save_db(store, item_ids={"a"}, path=path)
+    assert len(sqlite_db.load_db(path=path)["data"][0]["shown_at"]) == MAX_RECENT_SHOWS + 2
@@ -0,0 +1,94 @@
+import os
+import json
+
+import pytest
+
+from frame import BOARD_COLS, BOARD_ROWS, Frame, char_to_code, encode
+from vbml import compose
+from vestaboard import SOURCE_COLORS, format_rest_message
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "vbml_golden.json")
+
+
+def codes(text):
+    return [char_to_code[char] for char in text]
+
+
+# Uppercase wins, as the board has no lowercase letters
+code_to_char = {code: char for char, code in reversed(list(char_to_code.items()))}
+
+
+def decode(row):
+    return "".join(code_to_char.get(code, "?") for code in row)
+
+
+def board_text(board):
+    """The non-blank codes of the board in reading order."""
+    return [code for row in board for code in row if code]
+
+
+def golden_cases():
+    with open(GOLDEN_PATH) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("case", golden_cases())
+def test_matches_compose_api(case):
+    assert compose(case["vbml"]) == case["characters"]
+
+
+def test_board_size():
+    board = compose(format_rest_message("Short headline", SOURCE_COLORS["nyt"]))
+    assert len(board) == BOARD_ROWS
+    assert all(len(row) == BOARD_COLS for row in board)
+
+
+def test_color_in_bottom_right_corner():
+    board = compose(format_rest_message("Short headline", SOURCE_COLORS["nyt"]))
+    assert board[-1][-1] == SOURCE_COLORS["nyt"]
+
+
+def test_text_is_centered():
+    board = compose({"components": [{"style": {"justify": "center", "align": "center", "width": 22, "height": 6},
+                                     "template": "HELLO"}]})
+    assert board[2] == [0] * 8 + codes("HELLO") + [0] * 9
+    assert board_text(board) == codes("HELLO")
+
+
+def test_words_wrap_without_being_split():
+    message = "SpaceX launches another batch of Starlink satellites"
+    board = compose(format_rest_message(message, SOURCE_COLORS["spacenews"]))
+    rows = [decode(row[:-1]).split() for row in board if any(row[:-1])]
+    assert len(rows) > 1
+    # Every word of the message is found whole on one row
+    assert [word for row in rows for word in row] == message.upper().split()
+
+
+def test_typographic_characters():
+    board = compose({"components": [{"template": "IT’S “A” – B"}]})
+    assert board_text(board) == codes("IT'S") + codes('"A"') + codes("-B")
+
+
+def test_code_tokens():
+    board = compose({"components": [{"style": {"width": 2, "height": 1}, "template": "{63}{64}"}]})
+    assert board[0][:2] == [63, 64]
+
+
+def test_launch_countdown_overlay():
+    board = compose(format_rest_message("Falcon 9 | Starlink", SOURCE_COLORS["supercluster"], "0d 03h 25m"))
+    assert board[5][6:16] == codes("0D 03H 25M")
+    assert board[5][-1] == SOURCE_COLORS["supercluster"]
+
+
+def test_encode_uses_the_character_table():
+    assert encode("Go 4 it’s 50%!").tolist() == codes("GO 4 IT'S 50%!")
+    # Characters the board cannot show are blank
+    assert encode("é|€").tolist() == [0, 0, 0]
+
+
+def test_frame_row_centering():
+    frame = Frame()
+    frame.set_row_centered(1, "HELLO")
+    assert frame.to_list()[1] == [0] * 8 + codes("HELLO") + [0] * 9
+    frame.set_row_centered(1, "X" * 30)
+    assert frame.to_list()[1] == codes("X" * 22)
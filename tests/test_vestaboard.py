@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+import vestaboard
+from vestaboard import VestaboardClient
+
+
+class FakeSession:
+    """Raises the given errors in turn, then answers 200."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.posts = 0
+
+    def post(self, url, json, timeout):
+        self.posts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(vestaboard.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def make_client(errors):
+    client = VestaboardClient("key", min_push_interval=15)
+    client.session = FakeSession(errors)
+    return client
+
+
+def test_board_write_is_not_retried_after_a_read_timeout(sleeps):
+    client = make_client([requests.exceptions.ReadTimeout()])
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.send([[0] * 22] * 6)
+    assert client.session.posts == 1
+    assert sleeps == []
+
+
+def test_board_write_retries_wait_for_the_push_interval(sleeps):
+    client = make_client([requests.exceptions.ConnectTimeout()])
+    client.send([[0] * 22] * 6)
+    assert client.session.posts == 2
+    assert sleeps == [15]
+
+
+def test_compose_retries_read_timeouts_with_backoff(sleeps):
+    client = make_client([requests.exceptions.ReadTimeout(), requests.exceptions.ReadTimeout()])
+    assert client._post(vestaboard.VBML_COMPOSE_URL, {}).status_code == 200
+    assert sleeps == [1, 2]
@@ -1,30 +1,52 @@
 import os
 import json
-import random
+import tempfile
+import threading
+import sqlite_db
+import metrics
 from logger import Logger
+from store import Item, ItemStore, SHOWN_HISTORY_DAYS, parse_timestamp, from_timestamp, to_timestamp, roll_up_shows
 from datetime import datetime, timezone, timedelta
+from concurrent.futures import Future
+from contextlib import contextmanager
 
 
 logging = Logger.setup_logger(__name__)
 
+# Read once at import, as os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
 DB_PATH = 'data.json'
+# Small delta file for runs that only change the top-level values
+DB_STATE_PATH = 'data.state.json'
+STATE_KEYS = ["trigger_count", "current_item_id", "last_run_datetime", "source_last_shown"]
+REPORT_PATH = 'report.md'
+REPORT_STATE_PATH = 'report_state.json'
+REPORT_ARCHIVE_DIR = 'reports'
+# "json" keeps everything in DB_PATH, "sqlite" uses sqlite_db.SQLITE_DB_PATH
+DB_BACKEND = os.getenv('DB_BACKEND', 'json')
 NUM_OF_OLD_NEWS_TO_KEEP = 500
-SOURCES = [
-    "supercluster",
-    "spacenews",
-    "nyt",
-    "aidy",
-    "breaking_defense",
-]
+
 
 def get_db():
-    default_db = {
+    default_db = ItemStore({
         "version": "2",
         "last_run_datetime": datetime.now(timezone.utc).isoformat(),
         "trigger_count": 0,
         "current_item_id": "",
         "data": []
-    }
+    })
+    default_db.needs_full_write = True
+
+    if DB_BACKEND == 'sqlite':
+        db = sqlite_db.load_db(num_to_keep=NUM_OF_OLD_NEWS_TO_KEEP, reported_until=reported_until())
+        if db is None:
+            return default_db
+        db["data"] = [Item.from_dict(item) for item in db["data"]]
+        logging.info('Loaded data from SQLite')
+        return ItemStore(remove_old_launches(db))
+
     if not os.path.exists(DB_PATH):
         return default_db
 
@@ -36,36 +58,45 @@ def get_db():
 
     if db.get("version") != "2":
         return default_db
-    
-    db = cleanup_db(db)
+
+    if os.path.exists(DB_STATE_PATH):
+        try:
+            with open(DB_STATE_PATH, 'r') as f:
+                db.update(json.load(f))
+        except Exception as e:
+            logging.warning(f"Could not read {DB_STATE_PATH}: {e}")
+
+    # Timestamps are parsed here once, everything after works on integers
+    db["data"] = [Item.from_dict(item) for item in db["data"]]
+    num_of_items = len(db["data"])
+    last_run_datetime = db.get("last_run_datetime")
+    with metrics.span("cleanup"):
+        db = cleanup_db(db)
 
     logging.info('Loaded data')
 
-    return db
+    store = ItemStore(db)
+    store.needs_full_write = len(db["data"]) != num_of_items or db.get("last_run_datetime") != last_run_datetime
+    return store
 
 
 def remove_old_launches(db):
     """
     Remove any items in db['data'] that have a 'target_datetime' in the past.
+    Their shows are kept in the daily counts of db['shown_history'].
     Returns the updated db.
     """
-    now = datetime.now(timezone.utc)
+    now = to_timestamp(datetime.now(timezone.utc))
+    history = db.setdefault("shown_history", {})
     filtered_items = []
     for item in db.get("data", []):
         #temporary - to be removed
-        if item["source"] == 'supercluster' and item["id"] == 'c5a8096acaf97aa5410b23f295e7ac2c':
+        if item.source == 'supercluster' and item.id == 'c5a8096acaf97aa5410b23f295e7ac2c':
+            continue
+        if item.target_at is not None and item.target_at < now:
+            # Skip items with expired target_datetime.
+            roll_up_shows(history, item.source, item.shown_at)
             continue
-        target = item.get("target_datetime")
-        if target:
-            try:
-                target_dt = datetime.fromisoformat(target.replace("Z", "+00:00"))
-            except Exception:
-                # If parsing fails, retain the item.
-                filtered_items.append(item)
-                continue
-            if target_dt < now:
-                # Skip items with expired target_datetime.
-                continue
         filtered_items.append(item)
     db["data"] = filtered_items
     return db
@@ -81,22 +112,29 @@ def cleanup_db(db):
         if last_run_date == current_date:
             return db  # Already updated today
 
-    sorted_items = sorted(
-        db.get("data", []),
-        key=lambda item: datetime.fromisoformat(item["fetched_datetime"].replace("Z", "+00:00")),
-        reverse=True
-    )
+    today_start = to_timestamp(datetime.combine(current_date, datetime.min.time(), timezone.utc))
+    sorted_items = sorted(db.get("data", []), key=lambda item: item.fetched_at, reverse=True)
 
     new_items = []
     older_items_seen = 0
     for item in sorted_items:
         new_items.append(item)
-        fetched_date = datetime.fromisoformat(item["fetched_datetime"].replace("Z", "+00:00")).date()
-        if fetched_date != current_date:
+        if item.fetched_at < today_start:
             older_items_seen += 1
         if older_items_seen >= NUM_OF_OLD_NEWS_TO_KEEP:
             break
 
+    # Shows of dropped items, and reported shows beyond the latest few of kept
+    # items, go into the daily counts
+    history = db["shown_history"]
+    for item in sorted_items[len(new_items):]:
+        roll_up_shows(history, item.source, item.shown_at)
+    until = reported_until()
+    for item in new_items:
+        roll_up_shows(history, item.source, item.trim_shown_at(until))
+    first_day = (current_date - timedelta(days=SHOWN_HISTORY_DAYS)).isoformat()
+    db["shown_history"] = {day: counts for day, counts in history.items() if day >= first_day}
+
     db["data"] = new_items
     db["last_run_datetime"] = datetime.now(timezone.utc).isoformat()
 
@@ -105,105 +143,230 @@ def cleanup_db(db):
     return db
 
 
+def write_atomic(path, content):
+    """Write content to a temp file next to `path` and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    # Temp files are created 0600; keep the mode of the file being replaced,
+    # or the one a plain open() would give a new file
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.chmod(f.name, mode)
+    os.replace(f.name, path)
+
+
 def save_db(db):
-    with open(DB_PATH, 'w') as f:
-        json.dump(db, f, indent=4, ensure_ascii=False)
+    """Persist only what changed since the db was loaded, then the updates waiting for it."""
+    write_db(db)
+    db.run_after_save()
+
+
+def write_db(db):
+    if not db.is_dirty:
+        logging.info('No changes to save')
+        return
+
+    if DB_BACKEND == 'sqlite':
+        sqlite_db.save_db(db, item_ids=None if db.needs_full_write else db.dirty_item_ids)
+        db.mark_clean()
+        logging.info('Saved data to SQLite')
+        return
+
+    if not db.items_dirty:
+        write_atomic(DB_STATE_PATH, json.dumps({key: db.get(key) for key in STATE_KEYS}, indent=4))
+        db.mark_clean()
+        logging.info('Saved state delta')
+        return
+
+    write_atomic(DB_PATH, json.dumps(db.to_dict(), indent=4, ensure_ascii=False))
+    if os.path.exists(DB_STATE_PATH):
+        os.remove(DB_STATE_PATH)
+    db.mark_clean()
 
     logging.info('Saved data')
 
 
+# Updates collected by collect_updates, per thread
+_pending = threading.local()
+
+
+@contextmanager
+def collect_updates():
+    """
+    Collect the state updates the calling thread passes to defer_update instead
+    of applying them. Pullers run inside this, so the caller can apply the
+    updates once the items they describe are saved, or drop them with a result
+    it discards.
+    """
+    updates = []
+    _pending.updates = updates
+    try:
+        yield updates
+    finally:
+        _pending.updates = None
+
+
+def defer_update(update):
+    """Run `update` now, or hand it to the enclosing collect_updates."""
+    updates = getattr(_pending, "updates", None)
+    if updates is None:
+        update()
+    else:
+        updates.append(update)
+
+
+def submit_daemon(fn, *args) -> Future:
+    """
+    Run fn in a daemon thread and return a Future of its result. Unlike the
+    workers of an executor, the thread never keeps the process alive, so a
+    hung request cannot hold up the exit once nobody waits for it.
+    """
+    future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
 def get_time_remaining(target_time: str) -> str:
-    # Convert target_time string (ISO format) to a datetime object.
-    target_dt = datetime.fromisoformat(target_time.replace('Z', '+00:00'))
-    now = datetime.now(timezone.utc)
-    if target_dt < now:
+    return get_time_remaining_until(parse_timestamp(target_time))
+
+
+def get_time_remaining_until(target_at: int) -> str:
+    """Same as get_time_remaining, for a timestamp in microseconds since the epoch."""
+    remaining = target_at - to_timestamp(datetime.now(timezone.utc))
+    if remaining < 0:
         return ""  # Target time has passed.
-    delta = target_dt - now
-    days = delta.days
-    hours, remainder = divmod(delta.seconds, 3600)
-    minutes, _ = divmod(remainder, 60)
+    minutes = remaining // 60_000_000
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
     return f"{days}d {hours:02d}h {minutes:02d}m"
 
 
-def get_sorted_sources(db):
-    """Returns a list of source names sorted by last shown time (oldest first)."""
-    very_old_time = "2000-01-01T00:00:00.000000Z"
-    source_last_shown = {source: very_old_time for source in SOURCES}
+def load_report_state():
+    if os.path.exists(REPORT_STATE_PATH):
+        try:
+            with open(REPORT_STATE_PATH, 'r') as f:
+                state = json.load(f)
+        except Exception as e:
+            logging.warning(f"Could not read {REPORT_STATE_PATH}, rebuilding the report: {e}")
+            return None
+        # Older state files kept the event times as ISO strings
+        if isinstance(state["last_event"], str):
+            state["last_event"] = parse_timestamp(state["last_event"]) if state["last_event"] else 0
+        state["recent_shown"] = [
+            [parse_timestamp(event_time) if isinstance(event_time, str) else event_time, line]
+            for event_time, line in state["recent_shown"]
+        ]
+        return state
+    return None
+
+
+def reported_until():
+    """Time of the last event in the report, 0 before the first report."""
+    state = load_report_state()
+    return state["last_event"] if state else 0
+
+
+def collect_report_events(items, since):
+    """Returns the (time, kind, item) fetched/shown events of the items that happened after `since`."""
+    events = []
+    for item in items:
+        if item.fetched_at > since:
+            events.append((item.fetched_at, "fetched", item))
+        for shown_time in item.shown_at:
+            if shown_time > since:
+                events.append((shown_time, "shown", item))
+    events.sort(key=lambda event: event[0])
+    return events
 
-    for item in db.get("data", []):
-        source = item["source"]
-        for shown_time in item.get("shown_at", []):
-            source_last_shown[source] = max(source_last_shown[source], shown_time)
-
-    return sorted(source_last_shown, key=source_last_shown.get)
 
 def generate_report(db):
-    now = datetime.now(timezone.utc)
-    one_day_ago = now - timedelta(days=1)
-    two_days_ago = now - timedelta(days=2)
-    
-    # Extracting data
-    data = db.get("data", [])
-    
-    # Preparing source frequency data
-    source_stats = {}
-    
-    for item in data:
-        source = item["source"]
-        fetched_datetime = datetime.fromisoformat(item["fetched_datetime"].replace('Z', '+00:00'))
-        shown_at = [datetime.fromisoformat(dt.replace('Z', '+00:00')) for dt in item.get("shown_at", [])]
-        
-        if source not in source_stats:
-            source_stats[source] = {"fetched_1d": 0, "fetched_2d": 0, "shown_1d": 0, "shown_2d": 0}
-        
-        if fetched_datetime:
-            if fetched_datetime >= one_day_ago:
-                source_stats[source]["fetched_1d"] += 1
-            if fetched_datetime >= two_days_ago:
-                source_stats[source]["fetched_2d"] += 1
-        
-        for shown_time in shown_at:
-            if shown_time >= one_day_ago:
-                source_stats[source]["shown_1d"] += 1
-            if shown_time >= two_days_ago:
-                source_stats[source]["shown_2d"] += 1
-    
-    # Preparing shown order data
-    shown_order = []
-    for item in data:
-        for shown_time in item.get("shown_at", []):
-            shown_order.append((shown_time, item["text"], item["source"]))
-    
-    # Sorting shown order by time
-    shown_order.sort()
-    
-    # Writing report.md
-    with open("report.md", "w", encoding="utf-8") as file:
-        file.write("# Source Frequency\n\n")
-        file.write("| Source | Fetched (Last 1 Day) | Fetched (Last 2 Days) | Shown (Last 1 Day) | Shown (Last 2 Days) |\n")
-        file.write("|--------|------------------|------------------|----------------|----------------|\n")
-        
-        for source, stats in source_stats.items():
-            file.write(f"| {source} | {stats['fetched_1d']} | {stats['fetched_2d']} | {stats['shown_1d']} | {stats['shown_2d']} |\n")
-        
-        file.write("\n# Shown Order\n\n")
-        for time, message, source in shown_order:
-            formatted_time = datetime.strptime(time, "%Y-%m-%dT%H:%M:%S.%fZ").strftime("%b %d, %I:%M %p")
-            file.write(f"- **{formatted_time}** - {message} ({source})\n")
-
-
-def get_random_recent_item(db, source, days=7):
-    """Returns a random item from the given source within the last `days` days, or None if none exist."""
-    now = datetime.now(timezone.utc)
-    cutoff_time = now - timedelta(days=days)
-
-    # Filter messages by source and fetch time within the last `days`
-    recent_items = [
-        item for item in db.get("data", []) 
-        if item["source"] == source and datetime.fromisoformat(item["fetched_datetime"].replace("Z", "+00:00")) >= cutoff_time
+    """
+    Update report.md from the events since the last run. Per-source counts are
+    kept in hourly buckets covering the last two days, and each shown event is
+    added once to the dated archive file of its day.
+    """
+    state = load_report_state()
+    if state is None:
+        # First run: replay the whole history once
+        state = {"last_event": 0, "buckets": {}, "recent_shown": []}
+        items = db.get("data", [])
+    else:
+        items = [db.get_item(item_id) for item_id in db.dirty_item_ids if db.get_item(item_id)]
+
+    events = collect_report_events(items, state["last_event"])
+
+    archive_lines = {}
+    for event_time, kind, item in events:
+        source_buckets = state["buckets"].setdefault(item.source, {"fetched": {}, "shown": {}})
+        event_datetime = from_timestamp(event_time)
+        hour = event_datetime.strftime('%Y-%m-%dT%H')
+        source_buckets[kind][hour] = source_buckets[kind].get(hour, 0) + 1
+        if kind == "shown":
+            line = f"- **{event_datetime.strftime('%b %d, %I:%M %p')}** - {item.text} ({item.source})\n"
+            state["recent_shown"].append([event_time, line])
+            archive_lines.setdefault(event_datetime.strftime('%Y-%m-%d'), []).append(line)
+        state["last_event"] = max(state["last_event"], event_time)
+
+    os.makedirs(REPORT_ARCHIVE_DIR, exist_ok=True)
+    for day, lines in archive_lines.items():
+        path = os.path.join(REPORT_ARCHIVE_DIR, f"{day}.md")
+        existing = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                existing = file.readlines()
+        # Rebuilt rather than appended to, so events replayed after the state
+        # file was lost are not archived twice
+        known = set(existing)
+        write_atomic(path, "".join(existing + [line for line in lines if line not in known]))
+
+    # Drop everything that fell out of the two day window
+    current_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    one_day_ago = (current_hour - timedelta(days=1)).strftime('%Y-%m-%dT%H')
+    two_days_ago = current_hour - timedelta(days=2)
+    two_days_ago_hour = two_days_ago.strftime('%Y-%m-%dT%H')
+    for source_buckets in state["buckets"].values():
+        for kind in source_buckets:
+            source_buckets[kind] = {hour: n for hour, n in source_buckets[kind].items() if hour >= two_days_ago_hour}
+    state["recent_shown"] = [entry for entry in state["recent_shown"] if entry[0] >= to_timestamp(two_days_ago)]
+
+    lines = [
+        "# Source Frequency\n\n",
+        "| Source | Fetched (Last 1 Day) | Fetched (Last 2 Days) | Shown (Last 1 Day) | Shown (Last 2 Days) |\n",
+        "|--------|------------------|------------------|----------------|----------------|\n",
     ]
+    for source, source_buckets in state["buckets"].items():
+        fetched, shown = source_buckets["fetched"], source_buckets["shown"]
+        fetched_1d = sum(n for hour, n in fetched.items() if hour >= one_day_ago)
+        shown_1d = sum(n for hour, n in shown.items() if hour >= one_day_ago)
+        lines.append(f"| {source} | {fetched_1d} | {sum(fetched.values())} | {shown_1d} | {sum(shown.values())} |\n")
+
+    lines.append("\n# Shown Order\n\n")
+    lines.append(f"Last 2 days; older entries are archived per day in `{REPORT_ARCHIVE_DIR}/`.\n\n")
+    lines.extend(line for _, line in state["recent_shown"])
+    report = "".join(lines)
+
+    write_atomic(REPORT_STATE_PATH, json.dumps(state, indent=4, ensure_ascii=False))
+
+    # Writing report.md, unless it would not change
+    if os.path.exists(REPORT_PATH):
+        with open(REPORT_PATH, "r", encoding="utf-8") as file:
+            if file.read() == report:
+                return
+    write_atomic(REPORT_PATH, report)
 
-    return random.choice(recent_items) if recent_items else None
 
 def truncate_text(text, max_length=110, ellipsis="..."):
     """Trims text to 5 lines on vestaboard."""
@@ -0,0 +1,112 @@
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from frame import BOARD_COLS, BOARD_ROWS, Frame, encode, place_row
+
+CODE_TOKEN_PATTERN = re.compile(r'\{(\d{1,2})\}')
+
+
+def encode_word(word: str) -> List[int]:
+    """Character codes of a word, with {NN} tokens taken as codes."""
+    if '{' not in word:
+        return encode(word).tolist()
+    codes = []
+    # split alternates text and the digits of the tokens
+    for i, piece in enumerate(CODE_TOKEN_PATTERN.split(word)):
+        if i % 2:
+            codes.append(int(piece))
+        elif piece:
+            codes.extend(encode(piece).tolist())
+    return codes
+
+
+def template_to_lines(template: str) -> List[List[List[int]]]:
+    """Split a template into lines of words, each word a list of character codes."""
+    if '{' in template:
+        return [[encode_word(word) for word in line.split(' ') if word] for line in template.split('\n')]
+    # One character is one code, so the words are slices of a single encode
+    codes = encode(template).tolist()
+    lines, start = [], 0
+    for line in template.split('\n'):
+        words = []
+        for word in line.split(' '):
+            if word:
+                words.append(codes[start:start + len(word)])
+            start += len(word) + 1
+        lines.append(words)
+    return lines
+
+
+def wrap_words(words: List[List[int]], width: int) -> List[List[int]]:
+    """Greedy word wrap; words longer than the width are broken up."""
+    rows = []
+    current = []
+    for word in words:
+        while len(word) > width:
+            if current:
+                rows.append(current)
+                current = []
+            rows.append(word[:width])
+            word = word[width:]
+        if not word:
+            continue
+        if current and len(current) + 1 + len(word) > width:
+            rows.append(current)
+            current = []
+        current = current + [0] + word if current else list(word)
+    if current:
+        rows.append(current)
+    return rows
+
+
+def render_component(component: Dict) -> np.ndarray:
+    """Render one component into a grid of its own width and height."""
+    style = component.get("style", {})
+    width = style.get("width", BOARD_COLS)
+    height = style.get("height", BOARD_ROWS)
+    justify = style.get("justify", "left")
+    align = style.get("align", "top")
+
+    rows = []
+    for words in template_to_lines(component.get("template", "")):
+        rows.extend(wrap_words(words, width) or [[]])
+    rows = rows[:height]
+
+    if align == "center":
+        top = (height - len(rows)) // 2
+    elif align == "bottom":
+        top = height - len(rows)
+    else:
+        top = 0
+
+    grid = np.zeros((height, width), dtype=np.uint8)
+    for i, row in enumerate(rows):
+        place_row(grid[top + i], row, justify)
+    return grid
+
+
+def compose(vbml: Dict) -> List[List[int]]:
+    """
+    Render the VBML subset used by this project into a 6x22 character code
+    matrix: justify/align, absolutePosition overlays and {NN} code tokens.
+    Components without a position flow left to right from the top left corner.
+    """
+    board = Frame()
+    flow_x, flow_y, flow_row_height = 0, 0, 0
+    for component in vbml.get("components", []):
+        grid = render_component(component)
+        height, width = grid.shape
+
+        position = component.get("style", {}).get("absolutePosition")
+        if position:
+            x, y = position.get("x", 0), position.get("y", 0)
+        else:
+            if flow_x + width > BOARD_COLS:
+                flow_x, flow_y, flow_row_height = 0, flow_y + flow_row_height, 0
+            x, y = flow_x, flow_y
+            flow_x += width
+            flow_row_height = max(flow_row_height, height)
+        board.paste(grid, x, y)
+    return board.to_list()
@@ -1,10 +1,16 @@
 import os
 import json
+import time
 import logging
 import requests
-from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from datetime import datetime
 
 from utils import truncate_text
+from vbml import compose
+from frame import Frame
+from frame_cache import get_frame_cache
+import metrics
 
 # Set up logging
 logging.basicConfig(
@@ -14,24 +20,14 @@ logging.basicConfig(
 )
 
 VESTABOARD_API_URL = os.getenv('VESTABOARD_API_URL')
-headers = {
-    'X-Vestaboard-Read-Write-Key': os.getenv('VESTABOARD_API_KEY')
-}
+VBML_COMPOSE_URL = 'https://vbml.vestaboard.com/compose'
+VESTABOARD_RW_URL = 'https://rw.vestaboard.com/'
+# "local" renders VBML with vbml.compose, checked against the compose API
+# outputs in tests/fixtures/vbml_golden.json; "remote" asks the compose API
+VBML_RENDERER = os.getenv('VBML_RENDERER', 'local')
 
 CURRENT_DATE = datetime.now().strftime('%Y-%m-%d')
 
-# Character mapping for Vestaboard
-char_to_code = {
-    ' ': 0, 'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8, 'I': 9, 'J': 10, 'K': 11, 'L': 12, 'M': 13,
-    'N': 14, 'O': 15, 'P': 16, 'Q': 17, 'R': 18, 'S': 19, 'T': 20, 'U': 21, 'V': 22, 'W': 23, 'X': 24, 'Y': 25, 'Z': 26,
-    '1': 27, '2': 28, '3': 29, '4': 30, '5': 31, '6': 32, '7': 33, '8': 34, '9': 35, '0': 36, '!': 37, '@': 38, '#': 39,
-    '$': 40, '(': 41, ')': 42, '-': 44, '+': 46, '&': 47, '=': 48, ';': 49, ':': 50, "'": 52, '"': 53, '%': 54, ',': 55,
-    '.': 56, '/': 59, '?': 60, '°': 62, 'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8, 'i': 9, 'j': 10,
-    'k': 11, 'l': 12, 'm': 13, 'n': 14, 'o': 15, 'p': 16, 'q': 17, 'r': 18, 's': 19, 't': 20, 'u': 21, 'v': 22, 'w': 23,
-    'x': 24, 'y': 25, 'z': 26
-}
-
-
 def format_message_for_grid(content, line_lengths, max_lines=5):
     logging.info("Formatting message for grid.")
     words = content.split()
@@ -59,6 +55,21 @@ def format_message_for_grid(content, line_lengths, max_lines=5):
 
     return lines
 
+def countdown_component(time_remaining):
+    """The 12 cell countdown overlay on the bottom row of launch frames."""
+    return {
+        "style": {
+            "width": 12,
+            "height": 1,
+            "absolutePosition": {
+                "x": 6,
+                "y": 5
+            },
+        },
+        "template": f"{time_remaining}"
+    }
+
+
 def format_rest_message(message, color, time_remaining=''):
     logging.info("Formatting message with color.")
     content = " ".join(format_message_for_grid(message, line_lengths=[22, 22, 22, 22, 22, 20], max_lines=6))
@@ -77,20 +88,7 @@ def format_rest_message(message, color, time_remaining=''):
                 },
                 "template": f"{content}"
             },
-            *(
-            [{
-                "style": {
-                    "width": 12,
-                    "height": 1,
-                    "absolutePosition": {
-                        "x": 6,
-                        "y": 5
-                    },
-                },
-                "template": f"{time_remaining}"
-            }]
-            if time_remaining else []
-            ),
+            *([countdown_component(time_remaining)] if time_remaining else []),
             {
                 "style": {
                     "width": 1,
@@ -106,61 +104,6 @@ def format_rest_message(message, color, time_remaining=''):
     }
 
 
-def create_vestaboard_message(title):
-    logging.info("Creating Vestaboard message.")
-    message_layout = [[0 for _ in range(22)] for _ in range(6)]
-
-    words = title.split(' ')
-    current_row = []
-    current_line_length = 0
-    temp_message_layout = []
-
-    for word in words:
-        word = word.replace("’", "'")
-        word_length = len(word)
-
-        if current_line_length + word_length <= 22:
-            current_row.append(word)
-            current_line_length += word_length + 1
-        else:
-            line = ' '.join(current_row)
-            if len(line) > 22:
-                line = line[:22]
-            num_spaces = (22 - len(line)) // 2
-
-            temp_row = [0] * 22
-            start_index = num_spaces
-            for i, char in enumerate(line):
-                if start_index + i < 22:
-                    temp_row[start_index + i] = char_to_code.get(char, 0)
-            temp_message_layout.append(temp_row)
-
-            current_row = [word]
-            current_line_length = word_length + 1
-
-    if current_row:
-        line = ' '.join(current_row)
-        if len(line) > 22:
-            line = line[:22]
-        num_spaces = (22 - len(line)) // 2
-        temp_row = [0] * 22
-        start_index = num_spaces
-        for i, char in enumerate(line):
-            if start_index + i < 22:
-                temp_row[start_index + i] = char_to_code.get(char, 0)
-        temp_message_layout.append(temp_row)
-
-    num_rows = len(temp_message_layout)
-    start_row = max(0, (6 - num_rows) // 2)
-
-    for i in range(min(num_rows, 6)):
-        message_layout[start_row + i] = temp_message_layout[i]
-
-    message_layout[-1][-1] = 63
-
-    return message_layout
-
-
 def update_source_link(source_link: str):
     html_template = f'''<!DOCTYPE html>
         <html>
@@ -174,43 +117,155 @@ def update_source_link(source_link: str):
         file.write(html_template)
 
 
+class VestaboardClient:
+    """
+    Read/write API client with a pooled keep-alive session, explicit timeouts and
+    exponential backoff. Pushes are spaced at least `min_push_interval` seconds
+    apart, as the board rejects messages sent faster than that.
+    """
+
+    def __init__(self, api_key, timeout=(5, 15), max_retries=4, backoff=2.0, min_push_interval=15):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.min_push_interval = min_push_interval
+        self.last_push = None
+
+        self.session = requests.Session()
+        self.session.headers.update({'X-Vestaboard-Read-Write-Key': api_key or ''})
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2)
+        self.session.mount('https://', adapter)
+
+    def _post(self, url, payload, write=False):
+        """
+        POST with retries. A `write` changes the board: a read timeout may mean it
+        already did, so it is not retried, and other retries wait at least
+        `min_push_interval`.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as err:
+                if attempt == self.max_retries or (write and isinstance(err, requests.exceptions.ReadTimeout)):
+                    raise
+                delay = self.retry_delay(attempt, write)
+                logging.warning(f"Request to {url} failed ({err}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else self.retry_delay(attempt, write)
+                if response.status_code == 429:
+                    delay = max(delay, self.min_push_interval)
+                logging.warning(f"Request to {url} returned {response.status_code}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def retry_delay(self, attempt, write):
+        delay = self.backoff ** attempt
+        return max(delay, self.min_push_interval) if write else delay
+
+    def compose(self, vbml):
+        """Turn a VBML component tree into a character code matrix."""
+        return self._post(VBML_COMPOSE_URL, vbml).json()
+
+    def send(self, characters):
+        """Show a character code matrix on the board."""
+        if self.last_push is not None:
+            wait = self.min_push_interval - (time.monotonic() - self.last_push)
+            if wait > 0:
+                logging.info(f"Waiting {wait:.0f}s for the Vestaboard rate limit")
+                time.sleep(wait)
+        response = self._post(VESTABOARD_RW_URL, characters, write=True)
+        self.last_push = time.monotonic()
+        return response
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = VestaboardClient(os.getenv('VESTABOARD_API_KEY'))
+    return _client
+
+
+# Color code shown in the bottom right corner for each source
+SOURCE_COLORS = {
+    "aidy": 64,
+    "supercluster": 65,
+    "spacenews": 63,
+    "breaking_defense": 67,
+    "nyt": 69,
+    "error": 68,
+}
+
+
+def render_item(item, color):
+    """Return the character code matrix for an item, rendering it only on a cache miss."""
+    frame_cache = get_frame_cache()
+    time_remaining = item.time_remaining if item.source == "supercluster" else ''
+    key = frame_cache.key(item.id, color, time_remaining)
+    characters = frame_cache.get(key)
+    if characters is not None:
+        metrics.count("frame_cache_hits_total")
+        logging.info("Using cached frame for Vestaboard.")
+        return characters
+    metrics.count("frame_cache_misses_total")
+
+    with metrics.span("render"):
+        vba_data = format_rest_message(message=item.text, color=color, time_remaining=time_remaining)
+    logging.info(f"Formatted message for Vestaboard: {json.dumps(vba_data)}")
+
+    with metrics.span("compose", renderer=VBML_RENDERER):
+        if VBML_RENDERER == 'remote':
+            characters = get_client().compose(vba_data)
+            logging.info("Layout response received from Vestaboard.")
+        else:
+            characters = compose(vba_data)
+    frame_cache.put(key, characters)
+    return characters
+
+
 def push_to_vestaboard(item):
-    logging.info(f"Pushing message to Vestaboard from source: {item['source']}")
+    """Push an item to the board. Returns True only if the board shows it."""
+    logging.info(f"Pushing message to Vestaboard from source: {item.source}")
+    frame_cache = get_frame_cache()
     try:
-        if item["source"] == "aidy":
-            vba_data = format_rest_message(message=item["text"], color=64)
-        elif item["source"] == "supercluster":
-            vba_data = format_rest_message(message=item["text"], color=65, time_remaining=item["time_remaining"])
-        elif item["source"] == "spacenews":
-            vba_data = format_rest_message(message=item["text"], color=63)
-        elif item["source"] == "breaking_defense":
-            vba_data = format_rest_message(message=item["text"], color=67)
-        elif item["source"] == "nyt":
-            vba_data = format_rest_message(message=item["text"], color=69)
-        elif item["source"] == "error":
-            vba_data = format_rest_message(message=item["text"], color=68)
-
-        logging.info(f"Formatted message for Vestaboard: {json.dumps(vba_data)}")
-
-        layout_response = requests.post('https://vbml.vestaboard.com/compose', headers=headers, json=vba_data)
-        # layout_response.raise_for_status()
-        logging.info("Layout response received from Vestaboard.")
-
-        vestaboard_response = requests.post('https://rw.vestaboard.com/', headers=headers, json=layout_response.json())
-        # vestaboard_response.raise_for_status()
-        logging.info(f"Message pushed to Vestaboard successfully: {vestaboard_response.json()}")
-
-        item["shown"] = True
-
-        current_datetime = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        if "shown_at" in item:
-            item["shown_at"].append(current_datetime)
+        characters = render_item(item, SOURCE_COLORS[item.source])
+
+        frame = Frame(characters)
+        current_frame = Frame(frame_cache.current_frame) if frame_cache.current_frame else Frame()
+        changed_cells = len(frame.diff(current_frame))
+        if frame_cache.current_frame and changed_cells == 0:
+            metrics.count("pushes_skipped_total")
+            logging.info("Frame is already on the board, skipping the push.")
         else:
-            item["shown_at"] = [current_datetime]
-
-        update_source_link(item.get("source_link", "Sorry no more details about this item"))
+            logging.info(f"Transition changes {changed_cells} cells, about {frame.flaps_from(current_frame)} flap steps.")
+            with metrics.span("push"):
+                vestaboard_response = get_client().send(characters)
+            metrics.count("pushes_total")
+            metrics.count("flap_steps_total", frame.flaps_from(current_frame))
+            logging.info(f"Message pushed to Vestaboard successfully: {vestaboard_response.text}")
+            frame_cache.current_frame = characters
 
     except requests.exceptions.RequestException as req_err:
+        metrics.count("push_failures_total")
         logging.error(f"Request error while pushing to Vestaboard: {req_err}")
+        return False
     except Exception as e:
+        metrics.count("push_failures_total")
         logging.error(f"An unexpected error occurred: {e}")
+        return False
+    finally:
+        frame_cache.save()
+
+    update_source_link(item.source_link or "Sorry no more details about this item")
+    return True